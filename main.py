@@ -65,6 +65,9 @@ def run():
         lock,
         stock_data_manager,
         shm,
+        # Coalesce back-to-back download notifications (offline reconciliation
+        # followed by the downloader agent) into a single publish.
+        publish_debounce_s=0.2,
     )
 
     loop = asyncio.new_event_loop()
@@ -87,8 +90,10 @@ def run():
         pass
     finally:
         srv.close()
+        server.stop_clock()
         loop.run_until_complete(srv.wait_closed())
         loop.close()
+        shared_memory_manager.close()
         # Ensure the shared-memory segment is cleaned up when the server
         # shuts down.
         shm.close()
@@ -1,11 +1,23 @@
 import asyncio
-import json
 import logging
 import time
 from typing import Dict, Any, Optional
 
+from utils.json_codec import dumps, loads
+
 
 logger = logging.getLogger(__name__)
+
+
+# Pre-encoded response frames for the fixed-shape discovery requests.  Only the
+# request ``id`` (and, for the epoch, two integers) vary between responses.
+_FRAME_HEAD = b'{"v":1,"id":'
+_SNAPSHOT_EPOCH_TAIL = (
+    b',"type":"response","op":"get_snapshot_epoch",'
+    b'"data":{"epoch":%d,"last_update_ms":%d}}\n'
+)
+
+
 class NDJSONServer:
     """Simple NDJSON request/response server for ticker discovery and quotes."""
 
@@ -19,6 +31,11 @@ class NDJSONServer:
         max_line_bytes: int = 65_536,
         idle_timeout_s: int = 60,
         req_timeout_s: int = 5,
+        write_buffer_high: int = 256 * 1024,
+        write_buffer_low: int = 64 * 1024,
+        max_batch_bytes: int = 32 * 1024,
+        max_burst_requests: int = 64,
+        clock_resolution_s: float = 0.1,
     ):
         self.quote_cache = quote_cache
         self.snapshot_state = snapshot_state
@@ -37,26 +54,111 @@ class NDJSONServer:
         self.max_line_bytes = max_line_bytes
         self.idle_timeout_s = idle_timeout_s
         self.req_timeout_s = req_timeout_s
+        self.write_buffer_high = write_buffer_high
+        self.write_buffer_low = write_buffer_low
+        self.max_batch_bytes = max_batch_bytes
+        # Requests served back-to-back from the read buffer before the handler
+        # yields to the loop, so one pipelining client cannot starve other
+        # connections or the clock timer.
+        self.max_burst_requests = max_burst_requests
+        # Responses for pipelined requests are coalesced per connection.  The
+        # first queued response schedules a flush with ``call_soon``, which
+        # only runs once the handler waits for more input, so every request
+        # already received is answered in a single write (or sooner, once the
+        # batch grows past ``max_batch_bytes``).
+        self._pending: Dict[asyncio.StreamWriter, bytearray] = {}
+        # Coarse wall clock used for ``stale`` flags.  The freshness window is
+        # measured in tens of seconds, so refreshing every
+        # ``clock_resolution_s`` avoids a clock read per ``get_quote``.
+        self.clock_resolution_s = clock_resolution_s
+        self._now_ms = int(time.time() * 1000)
+        self._tick_handle: Optional[asyncio.TimerHandle] = None
+        # ``list_tickers`` responses reuse a materialised key list until the
+        # snapshot epoch (or the number of cached quotes) changes.
+        self._tickers: list = []
+        self._tickers_key: Optional[tuple] = None
+        self._shm_tail: Optional[tuple] = None
+        # Request ``type`` -> bound handler; dispatch is a single dict lookup.
+        self._handlers = {
+            "list_tickers": self._op_list_tickers,
+            "get_quote": self._op_get_quote,
+            "get_snapshot_epoch": self._op_get_snapshot_epoch,
+            "get_shm_name": self._op_get_shm_name,
+            "acquire_ibkr": self._op_acquire_ibkr,
+            "release_ibkr": self._op_release_ibkr,
+        }
 
     # ------------------------------------------------------------------
     # Networking helpers
     # ------------------------------------------------------------------
-    async def start(self, host: str = "0.0.0.0", port: int = 12345):
-        """Start the TCP server and return the server instance."""
-        server = await asyncio.start_server(self.handle_client, host, port)
+    async def start(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 12345,
+        backlog: int = 1024,
+        reuse_port: bool = False,
+    ):
+        """Start the TCP server and return the server instance.
+
+        ``backlog`` sizes the kernel accept queue so bursts of new clients are
+        not refused while the loop is busy.  ``reuse_port`` sets
+        ``SO_REUSEPORT`` so a standby instance can bind the same port during a
+        restart.
+        """
+        # Allow the reader to buffer a few oversize lines so pipelined requests
+        # are consumed in fewer reads; ``max_line_bytes`` is still enforced per
+        # line in ``handle_client``.
+        server = await asyncio.start_server(
+            self.handle_client,
+            host,
+            port,
+            limit=self.max_line_bytes * 4,
+            backlog=backlog,
+            reuse_port=reuse_port or None,
+        )
         logger.info("NDJSON quote server listening on %s:%d", host, port)
         self._loop = asyncio.get_running_loop()
+        # Restarting replaces the clock timer instead of stacking another.
+        self.stop_clock()
+        self._tick()
         return server
 
+    def stop_clock(self) -> None:
+        """Cancel the cached-clock refresh; call once the server is closed."""
+        if self._tick_handle is not None:
+            self._tick_handle.cancel()
+            self._tick_handle = None
+
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Handle a single client connection."""
         peer = writer.get_extra_info("peername")
         logger.info("Client connected: %s", peer)
+        # A larger high-water mark lets ``drain`` return immediately for bursts
+        # of small responses instead of pausing on every write.  asyncio already
+        # enables TCP_NODELAY on TCP transports.
+        transport = writer.transport
+        if transport is not None:
+            transport.set_write_buffer_limits(
+                high=self.write_buffer_high, low=self.write_buffer_low
+            )
+        self._pending[writer] = bytearray()
+        burst = 0
         try:
             while True:
                 try:
-                    line = await asyncio.wait_for(reader.readline(), timeout=self.idle_timeout_s)
-                except asyncio.TimeoutError:
+                    # Apply backpressure from earlier flushes; this returns
+                    # without yielding unless the transport is paused.
+                    await writer.drain()
+                except ConnectionError:
+                    break
+                try:
+                    # ``asyncio.timeout`` (unlike ``wait_for``) does not wrap
+                    # ``readline`` in a task, so a buffered line is returned
+                    # without yielding and the scheduled flush waits for the
+                    # rest of a pipelined burst.
+                    async with asyncio.timeout(self.idle_timeout_s):
+                        line = await reader.readline()
+                except TimeoutError:
                     break
                 except ValueError:
                     # Raised if the incoming line exceeds the stream limit.
@@ -64,13 +166,18 @@ class NDJSONServer:
                     break
                 if not line:
                     break
+                burst += 1
+                if burst >= self.max_burst_requests:
+                    # Let other tasks (and the scheduled flush) run.
+                    burst = 0
+                    await asyncio.sleep(0)
                 if len(line) > self.max_line_bytes:
                     await self.send_error(writer, None, "BAD_REQUEST", "Line too long", peer)
                     continue
                 try:
-                    decoded = line.decode("utf-8").rstrip()
-                    logger.info("recv from %s: %s", peer, decoded)
-                    request = json.loads(decoded)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("recv from %s: %s", peer, line.decode("utf-8").rstrip())
+                    request = loads(line)
                 except Exception:
                     await self.send_error(writer, None, "BAD_REQUEST", "Malformed JSON", peer)
                     continue
@@ -96,154 +203,235 @@ class NDJSONServer:
                     continue
 
                 req_type = request["type"]
-                logger.info("handling from %s id=%s type=%s", peer, req_id, req_type)
-                start = time.time()
+                trace = logger.isEnabledFor(logging.DEBUG)
+                if trace:
+                    logger.debug("handling from %s id=%s type=%s", peer, req_id, req_type)
+                    start = time.time()
                 try:
-                    if req_type == "list_tickers":
-                        data = list(self.quote_cache.keys())
-                        response = {"v": 1, "id": req_id, "type": "response",
-                                    "op": "list_tickers", "data": data}
-                        await self.send(writer, response, peer)
-                    elif req_type == "get_quote":
-                        ticker = request.get("ticker")
-                        if not ticker:
-                            await self.send_error(writer, req_id, "BAD_REQUEST", "Missing ticker", peer, request)
-                            continue
-                        quote = self.quote_cache.get(ticker)
-                        if quote is None:
-                            await self.send_error(writer, req_id, "NOT_FOUND", f"Unknown ticker {ticker}", peer, request)
-                            continue
-                        data = dict(quote)
-                        data["ticker"] = ticker
-                        now_ms = int(time.time() * 1000)
-                        data["stale"] = now_ms - quote.get("ts_epoch_ms", 0) > self.freshness_window_ms
-                        response = {"v": 1, "id": req_id, "type": "response",
-                                    "op": "get_quote", "data": data}
-                        await self.send(writer, response, peer)
-                    elif req_type == "get_snapshot_epoch":
-                        data = {"epoch": self.snapshot_state.get("epoch", 0),
-                                "last_update_ms": self.snapshot_state.get("last_update_ms", 0)}
-                        response = {"v": 1, "id": req_id, "type": "response",
-                                    "op": "get_snapshot_epoch", "data": data}
-                        await self.send(writer, response, peer)
-                    elif req_type == "get_shm_name":
-                        if self.shm_name is None:
-                            await self.send_error(
-                                writer,
-                                req_id,
-                                "NOT_FOUND",
-                                "Shared memory not configured",
-                                peer,
-                                request,
-                            )
-                        else:
-                            data = {"shm_name": self.shm_name}
-                            response = {
-                                "v": 1,
-                                "id": req_id,
-                                "type": "response",
-                                "op": "get_shm_name",
-                                "data": data,
-                            }
-                            await self.send(writer, response, peer)
-                    elif req_type == "acquire_ibkr":
-                        if self.ibkr_reserved:
-                            await self.send_error(
-                                writer,
-                                req_id,
-                                "CONFLICT",
-                                "IBKR connection already reserved",
-                                peer,
-                                request,
-                            )
-                        else:
-                            if self.stock_data_manager is not None and getattr(self.stock_data_manager, "is_downloading", False):
-                                response = {
-                                    "v": 1,
-                                    "id": req_id,
-                                    "type": "response",
-                                    "op": "acquire_ibkr",
-                                    "data": {
-                                        "status": "denied",
-                                        "reason": "wait until stock download is finished",
-                                    },
-                                }
-                                await self.send(writer, response, peer)
-                            else:
-                                if self.stock_data_manager is not None:
-                                    try:
-                                        # Run the disconnect synchronously on
-                                        # the server thread so the ``ib_insync``
-                                        # client remains bound to a single
-                                        # event loop.  Offloading to a worker
-                                        # thread leads to "no current event
-                                        # loop" errors when subsequent
-                                        # requests reuse the connection.
-                                        self.stock_data_manager.disconnect_from_ibkr_tws()
-                                    except AttributeError:
-                                        pass
-                                self.ibkr_reserved = True
-                                self._ibkr_owner_writer = writer
-                                self._ibkr_owner_peer = peer
-                                response = {
-                                    "v": 1,
-                                    "id": req_id,
-                                    "type": "response",
-                                    "op": "acquire_ibkr",
-                                    "data": {"status": "acquired"},
-                                }
-                                await self.send(writer, response, peer)
-                    elif req_type == "release_ibkr":
-                        if not self.ibkr_reserved:
-                            await self.send_error(
-                                writer,
-                                req_id,
-                                "BAD_REQUEST",
-                                "IBKR connection not reserved",
-                                peer,
-                                request,
-                            )
-                        else:
-                            if self.stock_data_manager is not None:
-                                try:
-                                    # Similarly, reconnect directly on this
-                                    # thread to ensure the ``ib_insync`` client
-                                    # attaches to the correct event loop.
-                                    self.stock_data_manager.connect_to_ibkr_tws()
-                                except AttributeError:
-                                    pass
-                            self.ibkr_reserved = False
-                            self._ibkr_owner_writer = None
-                            self._ibkr_owner_peer = None
-                            response = {
-                                "v": 1,
-                                "id": req_id,
-                                "type": "response",
-                                "op": "release_ibkr",
-                                "data": {"status": "released"},
-                            }
-                            await self.send(writer, response, peer)
-                    else:
+                    handler = (
+                        self._handlers.get(req_type)
+                        if isinstance(req_type, str)
+                        else None
+                    )
+                    if handler is None:
                         await self.send_error(writer, req_id, "BAD_REQUEST", "Unknown request type", peer, request)
+                    else:
+                        await handler(writer, req_id, request, peer)
                 except Exception as exc:  # pragma: no cover - defensive
                     await self.send_error(writer, req_id, "INTERNAL", str(exc), peer, request)
                 finally:
-                    latency_ms = int((time.time() - start) * 1000)
-                    logger.info("completed id=%s type=%s latency_ms=%d", req_id, req_type, latency_ms)
+                    if trace:
+                        latency_ms = int((time.time() - start) * 1000)
+                        logger.debug("completed id=%s type=%s latency_ms=%d", req_id, req_type, latency_ms)
         finally:
             if writer is self._ibkr_owner_writer:
                 self._ibkr_owner_writer = None
                 self._ibkr_owner_peer = None
             logger.info("Client disconnected: %s", peer)
+            try:
+                await self.flush(writer)
+            except ConnectionError:
+                pass
+            self._pending.pop(writer, None)
             writer.close()
             await writer.wait_closed()
 
+    # ------------------------------------------------------------------
+    # Request handlers
+    # ------------------------------------------------------------------
+    async def _op_list_tickers(self, writer, req_id, request, peer):
+        data = self._list_tickers()
+        response = {"v": 1, "id": req_id, "type": "response",
+                    "op": "list_tickers", "data": data}
+        await self.send(writer, response, peer)
+
+    async def _op_get_quote(self, writer, req_id, request, peer):
+        ticker = request.get("ticker")
+        if not ticker:
+            await self.send_error(writer, req_id, "BAD_REQUEST", "Missing ticker", peer, request)
+            return
+        quote = self.quote_cache.get(ticker)
+        if quote is None:
+            await self.send_error(writer, req_id, "NOT_FOUND", f"Unknown ticker {ticker}", peer, request)
+            return
+        # Entries already carry ``ticker``; build the response payload with a
+        # single dict allocation.
+        data = {
+            **quote,
+            "stale": self._now_ms - quote.get("ts_epoch_ms", 0)
+            > self.freshness_window_ms,
+        }
+        response = {"v": 1, "id": req_id, "type": "response",
+                    "op": "get_quote", "data": data}
+        await self.send(writer, response, peer)
+
+    async def _op_get_snapshot_epoch(self, writer, req_id, request, peer):
+        tail = _SNAPSHOT_EPOCH_TAIL % (
+            self.snapshot_state.get("epoch", 0),
+            self.snapshot_state.get("last_update_ms", 0),
+        )
+        await self.send_frame(writer, req_id, tail, peer)
+
+    async def _op_get_shm_name(self, writer, req_id, request, peer):
+        if self.shm_name is None:
+            await self.send_error(
+                writer,
+                req_id,
+                "NOT_FOUND",
+                "Shared memory not configured",
+                peer,
+                request,
+            )
+        else:
+            await self.send_frame(writer, req_id, self._shm_name_tail(), peer)
+
+    async def _op_acquire_ibkr(self, writer, req_id, request, peer):
+        if self.ibkr_reserved:
+            await self.send_error(
+                writer,
+                req_id,
+                "CONFLICT",
+                "IBKR connection already reserved",
+                peer,
+                request,
+            )
+        else:
+            if self.stock_data_manager is not None and getattr(self.stock_data_manager, "is_downloading", False):
+                response = {
+                    "v": 1,
+                    "id": req_id,
+                    "type": "response",
+                    "op": "acquire_ibkr",
+                    "data": {
+                        "status": "denied",
+                        "reason": "wait until stock download is finished",
+                    },
+                }
+                await self.send(writer, response, peer)
+            else:
+                if self.stock_data_manager is not None:
+                    try:
+                        # Run the disconnect synchronously on the server
+                        # thread so the ``ib_insync`` client remains bound to
+                        # a single event loop.  Offloading to a worker thread
+                        # leads to "no current event loop" errors when
+                        # subsequent requests reuse the connection.
+                        self.stock_data_manager.disconnect_from_ibkr_tws()
+                    except AttributeError:
+                        pass
+                self.ibkr_reserved = True
+                self._ibkr_owner_writer = writer
+                self._ibkr_owner_peer = peer
+                response = {
+                    "v": 1,
+                    "id": req_id,
+                    "type": "response",
+                    "op": "acquire_ibkr",
+                    "data": {"status": "acquired"},
+                }
+                await self.send(writer, response, peer)
+
+    async def _op_release_ibkr(self, writer, req_id, request, peer):
+        if not self.ibkr_reserved:
+            await self.send_error(
+                writer,
+                req_id,
+                "BAD_REQUEST",
+                "IBKR connection not reserved",
+                peer,
+                request,
+            )
+        else:
+            if self.stock_data_manager is not None:
+                try:
+                    # Similarly, reconnect directly on this thread to ensure
+                    # the ``ib_insync`` client attaches to the correct event
+                    # loop.
+                    self.stock_data_manager.connect_to_ibkr_tws()
+                except AttributeError:
+                    pass
+            self.ibkr_reserved = False
+            self._ibkr_owner_writer = None
+            self._ibkr_owner_peer = None
+            response = {
+                "v": 1,
+                "id": req_id,
+                "type": "response",
+                "op": "release_ibkr",
+                "data": {"status": "released"},
+            }
+            await self.send(writer, response, peer)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _tick(self) -> None:
+        """Refresh the cached clock and reschedule the next refresh."""
+        self._now_ms = int(time.time() * 1000)
+        self._tick_handle = self._loop.call_later(self.clock_resolution_s, self._tick)
+
+    def _list_tickers(self) -> list:
+        """Return the cached ticker list, rebuilding it after a new snapshot."""
+        key = (self.snapshot_state.get("epoch", 0), len(self.quote_cache))
+        if key != self._tickers_key:
+            self._tickers = list(self.quote_cache.keys())
+            # Only pin the list to stable (even) epochs; a write in progress
+            # may still be adding tickers.
+            self._tickers_key = key if key[0] % 2 == 0 else None
+        return self._tickers
+
+    def _shm_name_tail(self) -> bytes:
+        """Return the encoded ``get_shm_name`` frame tail for ``shm_name``."""
+        if self._shm_tail is None or self._shm_tail[0] != self.shm_name:
+            tail = (
+                b',"type":"response","op":"get_shm_name","data":{"shm_name":'
+                + dumps(self.shm_name)
+                + b"}}\n"
+            )
+            self._shm_tail = (self.shm_name, tail)
+        return self._shm_tail[1]
+
     # ------------------------------------------------------------------
     # Serialization helpers
     # ------------------------------------------------------------------
+    async def send_frame(self, writer: asyncio.StreamWriter, req_id: Any, tail: bytes, peer):
+        """Send a pre-encoded response whose only variable prefix is ``id``."""
+        frame = _FRAME_HEAD + dumps(req_id) + tail
+        logger.debug("send to %s: %s", peer, frame)
+        await self._write(writer, frame)
+
     async def send(self, writer: asyncio.StreamWriter, message: Dict[str, Any], peer):
-        logger.info("send to %s: %s", peer, message)
-        writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        logger.debug("send to %s: %s", peer, message)
+        await self._write(writer, dumps(message) + b"\n")
+
+    async def _write(self, writer: asyncio.StreamWriter, data: bytes):
+        pending = self._pending.get(writer)
+        if pending is None:
+            writer.write(data)
+            await writer.drain()
+            return
+        if not pending:
+            asyncio.get_running_loop().call_soon(self._flush_queued, writer)
+        pending += data
+        if len(pending) >= self.max_batch_bytes:
+            await self.flush(writer)
+
+    def _flush_queued(self, writer: asyncio.StreamWriter) -> None:
+        """Write out queued responses; scheduled by :meth:`_write`."""
+        pending = self._pending.get(writer)
+        if pending:
+            data = bytes(pending)
+            pending.clear()
+            writer.write(data)
+
+    async def flush(self, writer: asyncio.StreamWriter):
+        """Write out any responses queued for ``writer`` and drain once."""
+        pending = self._pending.get(writer)
+        if not pending:
+            return
+        data = bytes(pending)
+        pending.clear()
+        writer.write(data)
         await writer.drain()
 
     async def send_error(
@@ -282,4 +470,7 @@ class NDJSONServer:
             "op": "release_ibkr",
             "data": {"status": "release_requested"},
         }
-        await self.send(self._ibkr_owner_writer, message, self._ibkr_owner_peer)
+        writer = self._ibkr_owner_writer
+        await self.send(writer, message, self._ibkr_owner_peer)
+        # The owner's handler is idle in ``readline``; push the request now.
+        await self.flush(writer)
@@ -25,6 +25,16 @@ import numpy as np
 # ``seqlock`` (u32).  The struct is little-endian with no padding.
 HEADER_STRUCT = struct.Struct("<QQQI")
 HEADER_SIZE = HEADER_STRUCT.size
+# Same layout as ``HEADER_STRUCT`` for in-place access through NumPy views.
+HEADER_DTYPE = np.dtype(
+    [
+        ("write_idx", "<u8"),
+        ("capacity", "<u8"),
+        ("last_ts", "<u8"),
+        ("seqlock", "<u4"),
+    ]
+)
+assert HEADER_DTYPE.itemsize == HEADER_SIZE
 
 
 @dataclass
@@ -105,6 +115,16 @@ def write_header(
     )
 
 
+def header_view(buf: memoryview, tl: TickerLayout) -> np.ndarray:
+    """Return a one-element structured array aliasing the header of ``tl``.
+
+    Long-lived writers and readers keep this view around so the seqlock and
+    indices can be loaded and stored in place without packing ``bytes``.
+    """
+
+    return np.frombuffer(buf, dtype=HEADER_DTYPE, count=1, offset=tl.offset)
+
+
 # ---------------------------------------------------------------------------
 # Column helpers
 # ---------------------------------------------------------------------------
@@ -113,17 +133,17 @@ def column_views(buf: memoryview, tl: TickerLayout) -> Tuple[np.ndarray, ...]:
     """Return NumPy views for all six columns of ``tl``.
 
     The returned arrays alias the underlying shared memory; modifying them will
-    mutate the shared region.
+    mutate the shared region.  ``buf`` is passed to NumPy as-is (any writable
+    buffer works), and long-lived callers should cache the result.
     """
 
-    mv = memoryview(buf)
     cap = tl.capacity
-    ts = np.frombuffer(mv, dtype=np.int64, count=cap, offset=tl.ts_off)
-    o = np.frombuffer(mv, dtype=np.float32, count=cap, offset=tl.o_off)
-    h = np.frombuffer(mv, dtype=np.float32, count=cap, offset=tl.h_off)
-    l = np.frombuffer(mv, dtype=np.float32, count=cap, offset=tl.l_off)
-    c = np.frombuffer(mv, dtype=np.float32, count=cap, offset=tl.c_off)
-    v = np.frombuffer(mv, dtype=np.int64, count=cap, offset=tl.v_off)
+    ts = np.frombuffer(buf, dtype=np.int64, count=cap, offset=tl.ts_off)
+    o = np.frombuffer(buf, dtype=np.float32, count=cap, offset=tl.o_off)
+    h = np.frombuffer(buf, dtype=np.float32, count=cap, offset=tl.h_off)
+    l = np.frombuffer(buf, dtype=np.float32, count=cap, offset=tl.l_off)
+    c = np.frombuffer(buf, dtype=np.float32, count=cap, offset=tl.c_off)
+    v = np.frombuffer(buf, dtype=np.int64, count=cap, offset=tl.v_off)
     return ts, o, h, l, c, v
 
 
@@ -140,6 +160,8 @@ def ring_slice(arr: np.ndarray, start: int, end: int, capacity: int) -> np.ndarr
     if start < end:
         return arr[start:end]
     if start == end:
-        # full buffer
+        # full buffer; already in logical order when it starts at slot 0
+        if start == 0:
+            return arr[:capacity]
         return np.concatenate((arr[start:], arr[:start]))
     return np.concatenate((arr[start:], arr[:end]))
@@ -11,7 +11,7 @@ from .columnar_layout import (
     TickerLayout,
     column_views,
     compute_layout,
-    read_header,
+    header_view,
     ring_slice,
 )
 
@@ -25,39 +25,48 @@ class ColumnarReader:
         self.layouts: Dict[str, TickerLayout] = {
             t: compute_layout(m["offset"], m["capacity"]) for t, m in index.items()
         }
+        self.headers: Dict[str, np.ndarray] = {
+            t: header_view(self.buf, tl) for t, tl in self.layouts.items()
+        }
+        # Column views alias stable memory, so build them once per ticker.
+        self.cols_by_ticker: Dict[str, Tuple[np.ndarray, ...]] = {
+            t: column_views(self.buf, tl) for t, tl in self.layouts.items()
+        }
 
     # ------------------------------------------------------------------
     def _read_cols(self, ticker: str) -> Tuple[np.ndarray, ...]:
-        tl = self.layouts[ticker]
-        header = read_header(self.buf, tl)
-        cols = column_views(self.buf, tl)
-        header2 = read_header(self.buf, tl)
-        if header2["seqlock"] % 2 or header2 != header:
+        # Header snapshots are ``(write_idx, capacity, last_ts, seqlock)``
+        # tuples.  Only ``write_idx`` and ``seqlock`` change on append, so
+        # those are the fields compared.
+        hdr = self.headers[ticker]
+        wi, _, _, seqlock = hdr[0].item()
+        cols = self.cols_by_ticker[ticker]
+        header = hdr[0].item()
+        if header[3] & 1 or header[3] != seqlock or header[0] != wi:
             # retry once
-            cols = column_views(self.buf, tl)
-            header2 = read_header(self.buf, tl)
-        self._last_header = header2
+            header = hdr[0].item()
+        self._last_header = header
         return cols
 
     # ------------------------------------------------------------------
     def view_last_n(self, ticker: str, n: int) -> Tuple[np.ndarray, ...]:
         cols = self._read_cols(ticker)
-        header = self._last_header
-        cap = header["capacity"]
+        end, cap, _, _ = self._last_header
         n = min(n, cap)
-        end = header["write_idx"]
         start = (end - n) % cap
         return tuple(ring_slice(col, start, end, cap) for col in cols)
 
     def view_since(self, ticker: str, ts_threshold: int) -> Tuple[np.ndarray, ...]:
-        tl = self.layouts[ticker]
-        header = read_header(self.buf, tl)
-        cap = header["capacity"]
+        cap = self.layouts[ticker].capacity
         cols = self.view_last_n(ticker, cap)
-        ts = cols[0]
-        mask = ts > ts_threshold
-        return tuple(col[mask] for col in cols)
+        # Rows are appended in timestamp order, so the logical view is sorted
+        # and the cut-off can be found with a binary search.
+        idx = int(np.searchsorted(cols[0], ts_threshold, side="right"))
+        return tuple(col[idx:] for col in cols)
 
     # ------------------------------------------------------------------
     def close(self) -> None:
+        # Drop cached views first; outstanding exports block ``shm.close``.
+        self.headers.clear()
+        self.cols_by_ticker.clear()
         self.shm.close()
@@ -5,11 +5,13 @@ from __future__ import annotations
 from multiprocessing import shared_memory
 from typing import Dict, Tuple
 
+import numpy as np
+
 from .columnar_layout import (
     TickerLayout,
     column_views,
     compute_layout,
-    read_header,
+    header_view,
     write_header,
 )
 
@@ -21,10 +23,15 @@ class ColumnarWriter:
         self.shm = shared_memory.SharedMemory(name=shm_name, create=True, size=size)
         self.buf = self.shm.buf
         self.layouts: Dict[str, TickerLayout] = {}
+        self.headers: Dict[str, np.ndarray] = {}
+        # Column views alias stable memory, so build them once per ticker.
+        self.cols_by_ticker: Dict[str, Tuple[np.ndarray, ...]] = {}
         for ticker, meta in index.items():
             layout = compute_layout(meta["offset"], meta["capacity"])
             self.layouts[ticker] = layout
             write_header(self.buf, layout, 0, layout.capacity, 0, 0)
+            self.headers[ticker] = header_view(self.buf, layout)
+            self.cols_by_ticker[ticker] = column_views(self.buf, layout)
 
     # ------------------------------------------------------------------
     def append(
@@ -39,14 +46,13 @@ class ColumnarWriter:
     ) -> Tuple[int, int]:
         """Append a row and return ``(write_idx, last_ts)`` after the write."""
 
-        tl = self.layouts[ticker]
-        header = read_header(self.buf, tl)
-        wi = header["write_idx"]
-        cap = header["capacity"]
-        seqlock = header["seqlock"] + 1
-        write_header(self.buf, tl, wi, cap, header["last_ts"], seqlock)
+        hdr = self.headers[ticker]
+        wi = int(hdr["write_idx"][0])
+        cap = int(hdr["capacity"][0])
+        # Odd seqlock: readers retry until the row below is fully written.
+        hdr["seqlock"] += 1
 
-        ts_col, o_col, h_col, l_col, c_col, v_col = column_views(self.buf, tl)
+        ts_col, o_col, h_col, l_col, c_col, v_col = self.cols_by_ticker[ticker]
         ts_col[wi] = ts
         o_col[wi] = o
         h_col[wi] = h
@@ -55,12 +61,59 @@ class ColumnarWriter:
         v_col[wi] = v
 
         wi = (wi + 1) % cap
-        seqlock += 1
-        write_header(self.buf, tl, wi, cap, ts, seqlock)
+        hdr["write_idx"] = wi
+        hdr["last_ts"] = ts
+        hdr["seqlock"] += 1
         return wi, ts
 
+    def append_many(
+        self,
+        ticker: str,
+        ts: np.ndarray,
+        o: np.ndarray,
+        h: np.ndarray,
+        l: np.ndarray,
+        c: np.ndarray,
+        v: np.ndarray,
+    ) -> Tuple[int, int]:
+        """Append a batch of rows and return ``(write_idx, last_ts)``.
+
+        The batch is published under a single seqlock bump and copied with at
+        most two slice assignments per column.  When more rows than
+        ``capacity`` are supplied only the newest ``capacity`` rows are kept,
+        matching repeated :meth:`append` calls.
+        """
+
+        hdr = self.headers[ticker]
+        wi = int(hdr["write_idx"][0])
+        cap = int(hdr["capacity"][0])
+        n = len(ts)
+        if n == 0:
+            return wi, int(hdr["last_ts"][0])
+
+        m = min(n, cap)
+        start = (wi + n - m) % cap
+        first = min(m, cap - start)
+        hdr["seqlock"] += 1
+
+        for col, src in zip(self.cols_by_ticker[ticker], (ts, o, h, l, c, v)):
+            src = src[n - m :]
+            col[start : start + first] = src[:first]
+            if first < m:
+                col[: m - first] = src[first:]
+
+        wi = (wi + n) % cap
+        last_ts = int(ts[-1])
+        hdr["write_idx"] = wi
+        hdr["last_ts"] = last_ts
+        hdr["seqlock"] += 1
+        return wi, last_ts
+
     # ------------------------------------------------------------------
     def close(self) -> None:
+        # Drop cached views first; outstanding exports block ``shm.close``.
+        self.headers.clear()
+        self.cols_by_ticker.clear()
         self.shm.close()
 
     def unlink(self) -> None:
@@ -1,14 +1,83 @@
-import json
 import logging
 import os
+import struct
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
 from typing import Optional
-from datetime import datetime
 
 from multiprocessing import shared_memory
 
 from stock.stock_data_interface import StockDataInterface
-from utils.paths import CSV_DATA_DIR
+from utils.json_codec import dumps
+from utils.paths import CSV_DATA_DIR, replace_atomically
+
+
+# The segment holds a little-endian u32 payload length followed by the JSON
+# payload, so readers copy exactly ``length`` bytes instead of scanning the
+# whole segment for trailing NULs.
+_LENGTH_PREFIX = struct.Struct("<I")
+
+_CSV_COLUMNS = ("Date", "Open", "High", "Low", "Close", "Volume")
+
+
+def _ohlcv_csv_text(df) -> Optional[str]:
+    """Render a downloaded OHLCV frame as CSV text.
+
+    Returns ``None`` for frames with any other shape, with missing values, or
+    with intraday timestamps, so callers can fall back to ``DataFrame.to_csv``
+    (which writes NaN as an empty cell and keeps the time of day).  Floats use ``repr`` so values
+    round-trip exactly, matching what ``to_csv`` writes.
+    """
+    columns = getattr(df, "columns", None)
+    if columns is None or tuple(columns) != _CSV_COLUMNS:
+        return None
+    if df.isna().to_numpy().any():
+        return None
+    dates = df["Date"]
+    if hasattr(dates, "dt"):
+        if (dates != dates.dt.normalize()).any():
+            return None
+        dates = dates.dt.strftime("%Y-%m-%d")
+    lines = [",".join(_CSV_COLUMNS)]
+    lines.extend(
+        f"{d},{o!r},{h!r},{l!r},{c!r},{v!r}"
+        for d, o, h, l, c, v in zip(
+            dates.tolist(),
+            df["Open"].tolist(),
+            df["High"].tolist(),
+            df["Low"].tolist(),
+            df["Close"].tolist(),
+            df["Volume"].tolist(),
+        )
+    )
+    lines.append("")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=4096)
+def _date_to_epoch_ms(date_str: str) -> int:
+    """Return local-midnight epoch milliseconds for a ``YYYY-MM-DD`` string.
+
+    Every ticker in a refresh usually ends on the same trading day, so the
+    parse is cached instead of running ``strptime`` once per ticker.
+    """
+    return int(time.mktime(time.strptime(date_str, "%Y-%m-%d")) * 1000)
+
+
+def _write_seqbegin(header) -> None:
+    """Open a seqlock write section on ``header["epoch"]``.
+
+    The epoch is forced odd rather than incremented so a section left open by
+    an earlier failure does not flip the parity back to "stable".
+    """
+    header["epoch"] |= 1
+
+
+def _write_seqend(header) -> None:
+    """Close a write section, publishing an even (stable) epoch."""
+    header["epoch"] += 1
 
 
 class SharedMemoryManager(StockDataInterface):
@@ -19,6 +88,8 @@ class SharedMemoryManager(StockDataInterface):
         lock,
         stock_data_manager,
         shm: Optional[shared_memory.SharedMemory] = None,
+        columnar_writer=None,
+        publish_debounce_s: Optional[float] = None,
     ):
         self.shared_dict = shared_dict
         self.lock = lock
@@ -34,6 +105,11 @@ class SharedMemoryManager(StockDataInterface):
         self.shared_mem = shm
         self.shm_name = shm.name if shm else None
 
+        # Optional :class:`ColumnarWriter`.  When set, each publish appends
+        # only the bars newer than a ticker's ring-buffer ``last_ts`` instead
+        # of rewriting its full history.
+        self.columnar_writer = columnar_writer
+
         # In-memory cache for the most recent quote of each ticker. The server
         # reads from this structure to serve `get_quote` requests in O(1)
         # without touching the historical data stored in the shared dictionary.
@@ -44,8 +120,40 @@ class SharedMemoryManager(StockDataInterface):
         # odd numbers indicate that a write is in progress.
         self.snapshot_state = {"epoch": 0, "last_update_ms": 0}
 
+        # Pre-encoded JSON for each entry's ``data``, keyed by ticker and
+        # stored with the dict it was encoded from.  Persisting the segment
+        # splices these bytes in, so only the small headers are re-encoded.
+        self._encoded_data = {}
+
         self.writer_pid = os.getpid()
 
+        # CSV persistence runs on a small background pool so the writer does
+        # not wait on disk I/O after publishing a snapshot.
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="csv-writer"
+        )
+        self._csv_futures = []
+        # Saves for one ticker are serialised by a per-ticker lock, and a
+        # queued save is dropped once a newer one for the same ticker has
+        # been submitted.  ``_csv_state_lock`` guards both dicts.
+        self._csv_state_lock = threading.Lock()
+        self._csv_locks = {}
+        self._csv_generation = {}
+
+        # With ``publish_debounce_s`` set, download notifications only flag a
+        # pending publish; a background thread waits that long and then
+        # publishes once, so bursts of notifications coalesce.  ``None`` keeps
+        # the synchronous publish from ``on_download_finished``.
+        self._publish_debounce_s = publish_debounce_s
+        self._publish_requested = threading.Event()
+        self._publisher_stop = threading.Event()
+        self._publisher_thread = None
+        if publish_debounce_s is not None:
+            self._publisher_thread = threading.Thread(
+                target=self._publish_loop, name="shm-publisher", daemon=True
+            )
+            self._publisher_thread.start()
+
         # Hydrate the in-memory structures from any cached CSV files before
         # starting the downloader.  This allows the server to begin serving
         # requests immediately in offline mode.
@@ -77,131 +185,263 @@ class SharedMemoryManager(StockDataInterface):
         pass
 
     def on_download_finished(self):
+        if self._publisher_thread is not None:
+            self._publish_requested.set()
+            return
         all_stock_data = self.stock_data_manager.get_all_stock_data()
         self.write_data(all_stock_data)
 
+    def _publish_loop(self) -> None:
+        while True:
+            self._publish_requested.wait()
+            # Let the rest of a burst arrive before publishing.
+            if self._publisher_stop.wait(self._publish_debounce_s):
+                return
+            self._publish_requested.clear()
+            try:
+                self.write_data(self.stock_data_manager.get_all_stock_data())
+            except Exception:
+                # ``write_data`` has already logged the failure; keep the
+                # publisher alive for the next notification.
+                pass
+
     def write_data(self, stock_data_list):
         logging.info("Writing %d tickers to shared memory", len(stock_data_list))
         try:
+            # Build and JSON-encode the per-ticker payloads before taking the
+            # lock; ``to_serializable_dict`` may convert a whole DataFrame.
+            # The locked section below only swaps the prepared payloads in.
+            snapshot = [
+                (
+                    stock_data.ticker,
+                    stock_data.to_serializable_dict(),
+                    self._encode_data(stock_data),
+                )
+                for stock_data in stock_data_list
+            ]
+            # CSV persistence is disk-bound and does not need the lock; it runs
+            # once the snapshot has been published.
+            csv_pending = [
+                stock_data for stock_data in stock_data_list
+                if stock_data.df is not None
+            ]
+            # ``self.lock`` only serialises writers against each other; readers
+            # never take it and rely solely on the epoch parity below.
             with self.lock:
-                # Increment the global snapshot epoch to an odd number to signal
+                # Move the global snapshot epoch to an odd number to signal
                 # that an update is in progress. Readers of the shared memory can
                 # detect this and retry until the epoch becomes even again.
-                self.snapshot_state["epoch"] += 1
+                _write_seqbegin(self.snapshot_state)
                 logging.info(
                     "Global epoch %d start", self.snapshot_state["epoch"]
                 )
-
-                # Use the actual ticker symbol as the key in shared memory so clients
-                # can access stock data by the expected ticker name instead of a
-                # generated index like "stock_0".  This ensures the shared memory
-                # keys accurately reflect the underlying data and matches the
-                # expectations of consumers of this module.
-                for stock_data in stock_data_list:
-                    key = stock_data.ticker
-
-                    # Retrieve existing entry or create a new one with a seqlock
-                    # style header.  The header fields allow readers to determine
-                    # whether they have observed a consistent snapshot.
-                    entry = self.shared_dict.get(
-                        key,
-                        {
-                            "header": {
-                                "version": 1,
-                                "epoch": 0,
-                                "last_update_ms": 0,
-                                "writer_pid": self.writer_pid,
-                            },
-                            "data": None,
-                        },
-                    )
-
-                    # Mark the entry as being written by incrementing the epoch to
-                    # an odd number before publishing any changes.
-                    entry["header"]["epoch"] += 1
-                    logging.debug(
-                        "Ticker %s epoch %d (writing)",
-                        key,
-                        entry["header"]["epoch"],
+                try:
+                    self._publish(snapshot)
+                    if self.columnar_writer is not None:
+                        self._append_columnar(snapshot)
+                finally:
+                    # Always close the write section so readers never spin on
+                    # an epoch left odd by a failed update.
+                    _write_seqend(self.snapshot_state)
+                    logging.info(
+                        "Global epoch %d commit", self.snapshot_state["epoch"]
                     )
-                    self.shared_dict[key] = entry
-
-                    data_dict = stock_data.to_serializable_dict()
-
-                    now_ms = int(time.time() * 1000)
-                    entry["data"] = data_dict
-                    entry["header"]["last_update_ms"] = now_ms
-                    entry["header"]["epoch"] += 1
-                    self.shared_dict[key] = entry
-                    logging.debug(
-                        "Ticker %s epoch %d (stable)",
-                        key,
-                        entry["header"]["epoch"],
-                    )
-
-                    # Update in-memory quote cache for fast `get_quote` lookups.
-                    try:
-                        if data_dict.get("df"):
-                            last = data_dict["df"][-1]
-                            ts_ms = int(
-                                time.mktime(time.strptime(last["Date"], "%Y-%m-%d"))
-                                * 1000
-                            )
-                            self.quote_cache[key] = {
-                                "price": last.get("Close"),
-                                "volume": last.get("Volume"),
-                                "currency": "USD",
-                                "ts_epoch_ms": ts_ms,
-                                "source": "shared_memory_manager",
-                            }
-                    except Exception as cache_error:
-                        logging.error("Error updating quote cache for %s: %s", key, cache_error)
-
-                    try:
-                        if stock_data.df is not None:
-                            csv_path = CSV_DATA_DIR / f"{stock_data.ticker}.csv"
-                            stock_data.df.to_csv(csv_path, index=False)
-                    except Exception as csv_error:
-                        logging.error(
-                            "Error while saving CSV for %s: %s",
-                            stock_data.ticker,
-                            csv_error,
-                        )
-
-                # Record the last update timestamp while the global epoch is
-                # still odd so readers know an update is in progress.  The
-                # epoch will be flipped to an even value only after the shared
-                # memory segment has been updated, preventing readers from
-                # observing a partially written payload.
-                self.snapshot_state["last_update_ms"] = int(time.time() * 1000)
-                if self.shared_mem is not None:
-                    self._persist_to_shared_memory()
-                # Finalize global snapshot epoch to an even value signalling a
-                # stable snapshot.
-                self.snapshot_state["epoch"] += 1
-                logging.info(
-                    "Global epoch %d commit", self.snapshot_state["epoch"]
+            self._csv_futures = [
+                future for future in self._csv_futures if not future.done()
+            ]
+            for stock_data in csv_pending:
+                with self._csv_state_lock:
+                    generation = self._csv_generation.get(stock_data.ticker, 0) + 1
+                    self._csv_generation[stock_data.ticker] = generation
+                self._csv_futures.append(
+                    self._io_pool.submit(self._save_csv, stock_data, generation)
                 )
         except Exception as e:
             logging.error("Error while writing data to shared memory: %s", e)
             raise
         logging.info("Finished writing data to shared memory")
 
+    def flush_csv_writes(self) -> None:
+        """Block until all queued CSV writes have completed."""
+        wait(self._csv_futures)
+        self._csv_futures = []
+
+    def close(self) -> None:
+        """Stop the debounced publisher and finish pending CSV writes."""
+        if self._publisher_thread is not None:
+            self._publisher_stop.set()
+            self._publish_requested.set()
+            self._publisher_thread.join()
+            self._publisher_thread = None
+        self._io_pool.shutdown(wait=True)
+        self._csv_futures = []
+
     # ------------------------------------------------------------------
-    def _persist_to_shared_memory(self) -> None:
-        """Serialize ``shared_dict`` into ``self.shared_mem`` as JSON."""
-        def _json_default(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+    def _publish(self, snapshot) -> None:
+        """Swap prepared ``(ticker, payload)`` pairs into the shared views.
+
+        Must be called inside an open global write section.
+        """
+        # Use the actual ticker symbol as the key in shared memory so clients
+        # can access stock data by the expected ticker name instead of a
+        # generated index like "stock_0".  This ensures the shared memory keys
+        # accurately reflect the underlying data and matches the expectations
+        # of consumers of this module.
+        for key, data_dict, data_bytes in snapshot:
+            # Build the entry locally and publish it with a single assignment
+            # so no reader of ``shared_dict`` sees a half-updated entry.
+            # ``shared_dict`` must be a plain in-process dict (main.py passes
+            # ``{}``); clients read the serialised segment, not this dict.  A
+            # ``multiprocessing.Manager`` proxy is not supported: it returns
+            # copies, so the identity check ``_encode_shared_dict`` uses to
+            # reuse ``_encoded_data`` would never match.  The
+            # header fields allow readers to determine whether they have
+            # observed a consistent snapshot.
+            previous = self.shared_dict.get(key)
+            if previous is not None:
+                header = dict(previous["header"])
+            else:
+                header = {
+                    "version": 1,
+                    "epoch": 0,
+                    "last_update_ms": 0,
+                    "writer_pid": self.writer_pid,
+                }
+
+            # ``header`` is a private copy nobody reads until it is stored below,
+            # so jump straight to the next even epoch.
+            header["epoch"] = (header["epoch"] | 1) + 1
+            header["last_update_ms"] = int(time.time() * 1000)
+            self.shared_dict[key] = {"header": header, "data": data_dict}
+            self._encoded_data[key] = (data_dict, data_bytes)
+            logging.debug("Ticker %s epoch %d", key, header["epoch"])
 
-        payload = json.dumps(
-            self.shared_dict, separators=(",", ":"), default=_json_default
-        ).encode("utf-8")
+            # Update in-memory quote cache for fast `get_quote` lookups.
+            try:
+                if data_dict.get("df"):
+                    last = data_dict["df"][-1]
+                    ts_ms = _date_to_epoch_ms(last["Date"])
+                    self.quote_cache[key] = {
+                        "ticker": key,
+                        "price": last.get("Close"),
+                        "volume": last.get("Volume"),
+                        "currency": "USD",
+                        "ts_epoch_ms": ts_ms,
+                        "source": "shared_memory_manager",
+                    }
+            except Exception as cache_error:
+                logging.error("Error updating quote cache for %s: %s", key, cache_error)
+
+        # Record the last update timestamp while the global epoch is still
+        # odd so readers know an update is in progress.  The epoch will be
+        # flipped to an even value only after the shared memory segment has
+        # been updated, preventing readers from observing a partially written
+        # payload.
+        self.snapshot_state["last_update_ms"] = int(time.time() * 1000)
+        if self.shared_mem is not None:
+            self._persist_to_shared_memory()
+
+    def _append_columnar(self, snapshot) -> None:
+        """Append bars newer than each ticker's ring ``last_ts`` (epoch ms)."""
+        writer = self.columnar_writer
+        for key, data_dict, _ in snapshot:
+            if key not in writer.layouts:
+                continue
+            rows = data_dict.get("df") or []
+            try:
+                last_ts = int(writer.headers[key]["last_ts"][0])
+                # Rows are in date order, so walk back from the end only as
+                # far as the bars the ring has not seen yet.
+                start = len(rows)
+                while start and _date_to_epoch_ms(rows[start - 1]["Date"]) > last_ts:
+                    start -= 1
+                new_rows = rows[start:]
+                if not new_rows:
+                    continue
+                writer.append_many(
+                    key,
+                    [_date_to_epoch_ms(row["Date"]) for row in new_rows],
+                    [row["Open"] for row in new_rows],
+                    [row["High"] for row in new_rows],
+                    [row["Low"] for row in new_rows],
+                    [row["Close"] for row in new_rows],
+                    [row["Volume"] for row in new_rows],
+                )
+            except Exception as columnar_error:
+                logging.error(
+                    "Error appending columnar rows for %s: %s", key, columnar_error
+                )
 
-        if len(payload) > self.shared_mem.size:
+    @staticmethod
+    def _encode_data(stock_data) -> bytes:
+        """Return ``stock_data``'s payload as JSON bytes.
+
+        Entries exposing a cached ``to_json_bytes`` (the offline CSV and
+        integration-mode holders) skip re-encoding unchanged data.
+        """
+        to_json_bytes = getattr(stock_data, "to_json_bytes", None)
+        if to_json_bytes is not None:
+            return to_json_bytes()
+        return dumps(stock_data.to_serializable_dict())
+
+    def _encode_shared_dict(self) -> bytes:
+        """Encode ``shared_dict`` reusing the pre-encoded entry payloads."""
+        parts = []
+        for key, entry in self.shared_dict.items():
+            cached = self._encoded_data.get(key)
+            if cached is not None and cached[0] is entry["data"]:
+                data_bytes = cached[1]
+            else:
+                data_bytes = dumps(entry["data"])
+            parts.append(
+                b'%s:{"header":%s,"data":%s}'
+                % (dumps(key), dumps(entry["header"]), data_bytes)
+            )
+        return b"{" + b",".join(parts) + b"}"
+
+    def _save_csv(self, stock_data, generation: Optional[int] = None) -> None:
+        """Persist ``stock_data.df`` to the CSV cache, logging any failure.
+
+        ``generation`` identifies the submission; the save is skipped when a
+        newer one for the same ticker has been queued since.
+        """
+        ticker = stock_data.ticker
+        with self._csv_state_lock:
+            ticker_lock = self._csv_locks.setdefault(ticker, threading.Lock())
+        try:
+            with ticker_lock:
+                if (
+                    generation is not None
+                    and generation != self._csv_generation.get(ticker)
+                ):
+                    return
+                csv_path = CSV_DATA_DIR / f"{ticker}.csv"
+                text = _ohlcv_csv_text(stock_data.df)
+                if text is None:
+                    replace_atomically(
+                        csv_path,
+                        lambda tmp_path: stock_data.df.to_csv(tmp_path, index=False),
+                    )
+                else:
+                    # One write per file; the OHLCV columns never need quoting.
+                    replace_atomically(
+                        csv_path, lambda tmp_path: tmp_path.write_text(text)
+                    )
+        except Exception as csv_error:
+            logging.error(
+                "Error while saving CSV for %s: %s",
+                stock_data.ticker,
+                csv_error,
+            )
+
+    def _persist_to_shared_memory(self) -> None:
+        """Serialize ``shared_dict`` into ``self.shared_mem`` as length-prefixed JSON."""
+        payload = self._encode_shared_dict()
+        needed = _LENGTH_PREFIX.size + len(payload)
+
+        if needed > self.shared_mem.size:
             new_size = 1
-            while new_size < len(payload):
+            while new_size < needed:
                 new_size *= 2
             name = self.shared_mem.name
             logging.warning(
@@ -219,17 +459,16 @@ class SharedMemoryManager(StockDataInterface):
             self.shared_mem = shared_memory.SharedMemory(name=name, create=True, size=new_size)
             self.shm_name = name
 
-        if len(payload) > self.shared_mem.size:
+        if needed > self.shared_mem.size:
             logging.error(
-                "Failed to resize shared memory segment %s to %d bytes", self.shared_mem.name, len(payload)
+                "Failed to resize shared memory segment %s to %d bytes", self.shared_mem.name, needed
             )
             return
 
-        self.shared_mem.buf[: len(payload)] = payload
-        if len(payload) < self.shared_mem.size:
-            self.shared_mem.buf[len(payload) : self.shared_mem.size] = b"\x00" * (
-                self.shared_mem.size - len(payload)
-            )
+        # Bytes past the prefixed length are ignored by readers, so the tail
+        # of the segment is no longer zero-filled on every publish.
+        self.shared_mem.buf[_LENGTH_PREFIX.size : needed] = payload
+        _LENGTH_PREFIX.pack_into(self.shared_mem.buf, 0, len(payload))
         logging.info(
             "Persisted %d bytes to shared memory segment %s",
             len(payload),
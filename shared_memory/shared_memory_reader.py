@@ -1,16 +1,23 @@
 import json
 import logging
+import struct
 from typing import Any, Dict, List, Optional
 from multiprocessing import shared_memory
 
+from utils.json_codec import loads
+
 logger = logging.getLogger(__name__)
 
+# Little-endian u32 payload length written by the manager at offset 0.
+_LENGTH_PREFIX = struct.Struct("<I")
+
 
 class StockDataReader:
     """Read historical stock data from a shared-memory segment.
 
     The reader understands the JSON layout produced by
-    :class:`SharedMemoryManager`.  For each ticker the segment contains a
+    :class:`SharedMemoryManager`: a 4-byte little-endian payload length
+    followed by the JSON document.  For each ticker the document contains a
     dictionary with a seqlock style header and the serialized data.  The reader
     retries a few times if it observes an odd epoch or if the JSON payload is
     being updated while reading.
@@ -54,13 +61,23 @@ class StockDataReader:
             self._shm = None
 
     # ------------------------------------------------------------------
-    def _load_dict(self) -> Dict[str, Any]:
+    def _read_raw(self) -> bytes:
         if self._shm is None:
-            return {}
-        raw = bytes(self._shm.buf).rstrip(b"\x00")
+            return b""
+        buf = self._shm.buf
+        (length,) = _LENGTH_PREFIX.unpack_from(buf, 0)
+        # Copy only the payload rather than the whole segment.
+        end = min(_LENGTH_PREFIX.size + length, len(buf))
+        return bytes(buf[_LENGTH_PREFIX.size : end])
+
+    def _load_dict(self, raw: Optional[bytes] = None) -> Dict[str, Any]:
+        if raw is None:
+            raw = self._read_raw()
         if not raw:
             return {}
-        return json.loads(raw.decode("utf-8"))
+        # Decode errors are ``json.JSONDecodeError`` with either backend, so
+        # the partial-write handling in ``get_stock`` applies unchanged.
+        return loads(raw)
 
     # ------------------------------------------------------------------
     def list_tickers(self) -> List[str]:
@@ -94,8 +111,9 @@ class StockDataReader:
             raise ValueError("Shared memory not configured")
 
         for attempt in range(self.max_retries):
+            raw = self._read_raw()
             try:
-                data = self._load_dict()
+                data = self._load_dict(raw)
             except json.JSONDecodeError as exc:  # partial write
                 logger.debug("JSON decode error on attempt %d: %s", attempt, exc)
                 continue
@@ -110,15 +128,11 @@ class StockDataReader:
                 continue
 
             payload = entry.get("data")
-            try:
-                data2 = self._load_dict()
-            except json.JSONDecodeError as exc:  # writer in progress
-                logger.debug("JSON decode error on reread %d: %s", attempt, exc)
-                continue
-
-            e2 = data2.get(ticker, {}).get("header", {}).get("epoch")
-            if e1 == e2 and e2 is not None and e2 % 2 == 0:
+            # Seqlock reread: an unchanged segment means the decoded payload
+            # was not torn by a concurrent write.  Comparing the raw bytes
+            # avoids decoding the whole segment a second time.
+            if self._read_raw() == raw:
                 return payload
-            logger.debug("Retry %d for %s: e1=%s e2=%s", attempt, ticker, e1, e2)
+            logger.debug("Retry %d for %s: segment changed while reading", attempt, ticker)
 
         raise RuntimeError("Could not obtain a stable snapshot after retries")
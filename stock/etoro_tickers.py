@@ -1,15 +1,30 @@
+from functools import lru_cache
+
 import pandas as pd
 
 DEBUG_MODE_ON = False
 
 
+@lru_cache(maxsize=1)
+def _load_tickers():
+    # Parsed once per process; only the symbol column is needed, so skip the
+    # remaining columns and the parser's type inference.
+    data = pd.read_csv(
+        "tickers_files/etoro_tickers.csv",
+        usecols=["Ticker"],
+        dtype={"Ticker": "string"},
+    )
+    return tuple(data.Ticker)
+
+
 class EToroTickers:
     def __init__(self):
-        self.list = []
+        self.list = ()
+        self.set = frozenset()
         self.initialize()
 
     def initialize(self):
-        data = pd.read_csv("tickers_files/etoro_tickers.csv")
-        self.list = data.Ticker
+        self.list = _load_tickers()
         if DEBUG_MODE_ON:
-            self.list = self.list.tail(10)
+            self.list = self.list[-10:]
+        self.set = frozenset(self.list)
@@ -0,0 +1,8 @@
+"""IBKR API limits shared by the downloaders.
+
+Kept free of ``ib_insync`` imports so integration-mode code can use them.
+"""
+
+# IBKR paces historical data requests at roughly 50 simultaneous requests;
+# stay a little below that when downloading tickers concurrently.
+MAX_CONCURRENT_REQUESTS = 45
@@ -1,9 +1,17 @@
+import asyncio
+import logging
+
 from ib_insync import IB, Stock, util
 import pandas as pd
 
+from stock.ibkr_limits import MAX_CONCURRENT_REQUESTS
+
+
+logger = logging.getLogger(__name__)
+
 
 class StockData:
-    def __init__(self, start_date, cur_date, end_date, period, ticker, ibkr_client):
+    def __init__(self, start_date, cur_date, end_date, period, ticker, ibkr_client, download=True):
         self.start_date = start_date
         self.cur_date = cur_date
         self.end_date = end_date
@@ -12,49 +20,102 @@ class StockData:
         self.ibkr_client = ibkr_client
         self.df = None
         self.ib = IB()
-        self.download_market_data()
+        # ``to_serializable_dict`` output is cached per download; the version
+        # is bumped whenever ``download_market_data`` replaces ``df``.
+        self._df_version = 0
+        self._serialized = None
+        if download:
+            self.download_market_data()
 
-    def download_market_data(self):
-        try:
-            contract = Stock(self.ticker.upper(), 'SMART', 'USD')
-
-            # Request all available historical data between the configured start
-            # and end dates instead of just a single day. This ensures both the
-            # shared memory payload and the persisted CSV contain the full
-            # dataset for each ticker.
-            start_dt = pd.to_datetime(self.start_date)
-            end_dt = pd.to_datetime(self.end_date)
-            duration_days = (end_dt - start_dt).days
-            duration_str = f"{duration_days} D"
-            end_date_str = end_dt.strftime("%Y%m%d %H:%M:%S")
-
-            bars = self.ibkr_client.reqHistoricalData(
-                contract,
-                endDateTime=end_date_str,
-                durationStr=duration_str,
-                barSizeSetting='1 day',
-                whatToShow='TRADES',
-                useRTH=True,
-                formatDate=1
-            )
+    def _historical_request(self):
+        """Return the contract and ``reqHistoricalData`` arguments for this ticker."""
+        contract = Stock(self.ticker.upper(), 'SMART', 'USD')
+
+        # Request all available historical data between the configured start
+        # and end dates instead of just a single day. This ensures both the
+        # shared memory payload and the persisted CSV contain the full
+        # dataset for each ticker.
+        start_dt = pd.to_datetime(self.start_date)
+        end_dt = pd.to_datetime(self.end_date)
+        duration_days = (end_dt - start_dt).days
+        duration_str = f"{duration_days} D"
+        end_date_str = end_dt.strftime("%Y%m%d %H:%M:%S")
 
+        return contract, dict(
+            endDateTime=end_date_str,
+            durationStr=duration_str,
+            barSizeSetting='1 day',
+            whatToShow='TRADES',
+            useRTH=True,
+            formatDate=1
+        )
+
+    def _load_bars(self, bars):
+        if logger.isEnabledFor(logging.DEBUG):
             for bar in bars:
-                print(
-                    f"{bar.date} | Open: {bar.open} | High: {bar.high} | Low: {bar.low} | Close: {bar.close} | Volume: {bar.volume}")
+                logger.debug(
+                    "%s | Open: %s | High: %s | Low: %s | Close: %s | Volume: %s",
+                    bar.date, bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+        # Filter and project in a single pass over the raw bar frame.
+        df = util.df(bars)
+        df = df.loc[
+            df['volume'] != 0,
+            ['date', 'open', 'high', 'low', 'close', 'volume'],
+        ].reset_index(drop=True)
+        df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+        df['Date'] = pd.to_datetime(df['Date'], cache=True)
+        self.df = df
 
-            self.df = util.df(bars)
-            self.df = self.df[['date', 'open', 'high', 'low', 'close', 'volume']]
-            self.df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-            self.df = self.df[self.df['Volume'] != 0]
-            self.df.reset_index(drop=True, inplace=True)
-            self.df['Date'] = pd.to_datetime(self.df['Date'])
+        logger.debug("Downloaded data for %s", self.ticker)
 
-            print(f"Downloaded data for {self.ticker}")
+    def download_market_data(self):
+        self._df_version += 1
+        try:
+            contract, params = self._historical_request()
+            bars = self.ibkr_client.reqHistoricalData(contract, **params)
+            self._load_bars(bars)
+        except Exception as e:
+            logger.warning("Failed to download data for %s: %s", self.ticker, e)
+            self.df = None
+
+    async def download_market_data_async(self, semaphore=None):
+        """Async variant of :meth:`download_market_data`.
 
+        ``semaphore`` bounds the number of requests in flight when many
+        tickers are downloaded together (see :meth:`fetch_many`).
+        """
+        self._df_version += 1
+        try:
+            contract, params = self._historical_request()
+            if semaphore is None:
+                bars = await self.ibkr_client.reqHistoricalDataAsync(contract, **params)
+            else:
+                async with semaphore:
+                    bars = await self.ibkr_client.reqHistoricalDataAsync(contract, **params)
+            self._load_bars(bars)
         except Exception as e:
-            print(f"Failed to download data for {self.ticker}: {str(e)}")
+            logger.warning("Failed to download data for %s: %s", self.ticker, e)
             self.df = None
 
+    @classmethod
+    async def fetch_many(cls, tickers, start_date, cur_date, end_date, period, ibkr_client,
+                         max_concurrency=MAX_CONCURRENT_REQUESTS):
+        """Download ``tickers`` concurrently and return their ``StockData`` objects.
+
+        Requests overlap on the IBKR connection, with at most
+        ``max_concurrency`` outstanding to stay under the API pacing limit.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        stocks = [
+            cls(start_date, cur_date, end_date, period, ticker, ibkr_client, download=False)
+            for ticker in tickers
+        ]
+        await asyncio.gather(
+            *(stock.download_market_data_async(semaphore) for stock in stocks)
+        )
+        return stocks
+
     def is_data_empty(self):
         return self.df is None
 
@@ -69,24 +130,35 @@ class StockData:
         return data_list
 
     def print_last_candle_open_close_volume(self):
-        last_row = self.df.tail(1)
-        last_closing = last_row['Close'].item()
-        last_opening = last_row['Open'].item()
-        last_volume = last_row['Volume'].item()
-        print(f"Ticker {self.ticker} - Last Closing: {last_closing}, "
-              f"Last Opening: {last_opening}, Last Volume: {last_volume}")
+        # Positional scalar reads avoid building a one-row frame and three
+        # intermediate Series just to print the last candle.
+        columns = self.df.columns
+        last_closing = self.df.iat[-1, columns.get_loc('Close')]
+        last_opening = self.df.iat[-1, columns.get_loc('Open')]
+        last_volume = self.df.iat[-1, columns.get_loc('Volume')]
+        logger.debug("Ticker %s - Last Closing: %s, Last Opening: %s, Last Volume: %s",
+                     self.ticker, last_closing, last_opening, last_volume)
 
     def to_serializable_dict(self):
         """Prepares the object for writing to shared memory (avoids pickling errors)."""
+        cached = self._serialized
+        if cached is not None and cached[0] == self._df_version:
+            return cached[1]
+
         if self.df is not None:
-            df_serializable = self.df.copy()
-            if 'Date' in df_serializable.columns:
-                df_serializable['Date'] = df_serializable['Date'].astype(str)  # ✅ Critical Fix
-            df_records = df_serializable.to_dict(orient="records")
+            # Build records from per-column lists instead of copying the frame
+            # and going through ``to_dict(orient="records")``.
+            columns = list(self.df.columns)
+            values = [
+                self.df[col].astype(str).tolist() if col == 'Date'  # ✅ Critical Fix
+                else self.df[col].tolist()
+                for col in columns
+            ]
+            df_records = [dict(zip(columns, row)) for row in zip(*values)]
         else:
             df_records = None
 
-        return {
+        data = {
             "ticker": self.ticker,
             "start_date": self.start_date,
             "cur_date": self.cur_date,
@@ -94,3 +166,5 @@ class StockData:
             "period": self.period,
             "df": df_records
         }
+        self._serialized = (self._df_version, data)
+        return data
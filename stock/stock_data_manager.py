@@ -1,10 +1,15 @@
 import asyncio
-import csv
 import logging
+import os
 import random
 import threading
 import time
-from datetime import datetime, timedelta
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
@@ -23,7 +28,11 @@ else:  # Fallback placeholders when running in integration-test mode
     StockData = None
     EToroTickers = None
 
-from utils.paths import CSV_DATA_DIR
+import pandas as pd
+
+from stock.ibkr_limits import MAX_CONCURRENT_REQUESTS
+from utils.json_codec import dumps
+from utils.paths import CSV_DATA_DIR, replace_atomically
 
 
 logger = logging.getLogger(__name__)
@@ -32,7 +41,34 @@ cur_date = datetime.now()
 start_date = (cur_date - timedelta(days=365)).strftime("%Y-%m-%d")
 cur_date_db = cur_date
 end_date = cur_date
-period = "1 D"
+_FIXED_PERIOD = "1 D"
+period = _FIXED_PERIOD
+
+# Dedicated generator for integration-mode quotes; bound methods avoid the
+# module attribute lookups of ``random.uniform``/``random.randint``.
+_RNG = random.Random()
+
+_CSV_CHUNK_ROWS = 16384
+_CSV_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+# Volume is parsed as float so blank cells (NaN) can be defaulted to zero
+# before the cast to int64.
+_CSV_DTYPES = {
+    "Date": str,
+    "Open": "float64",
+    "High": "float64",
+    "Low": "float64",
+    "Close": "float64",
+    "Volume": "float64",
+}
+
+# Blank cells in these columns make a cached row malformed.
+_REQUIRED_CSV_COLUMNS = ["Date", "Open", "High", "Low", "Close"]
+
+_row_fields = itemgetter(*_CSV_COLUMNS)
+
+# Cached CSVs written within this window are served as-is by the downloader
+# agent instead of re-requesting the same daily bars from IBKR.
+CACHE_TTL_SECONDS = 24 * 60 * 60
 
 
 class StockDataManager:
@@ -41,7 +77,9 @@ class StockDataManager:
         self.stock_data_list = []
         self.is_downloading = False
         self._offline_data_loaded = False
-        self._cached_ranges: Dict[str, Tuple[str, str]] = {}
+        # Set once ``load_local_data`` has run, whether or not it found data.
+        self._local_data_attempted = False
+        self._cached_ranges: Dict[str, _Range] = {}
         self._stop_event = threading.Event()
         self._downloader_thread: Optional[threading.Thread] = None
 
@@ -50,6 +88,12 @@ class StockDataManager:
             "XOM", "WMT", "JPM", "META", "PG", "MA", "CVX", "HD", "KO", "PEP",
         ]
 
+        # The download mode is fixed for the manager's lifetime, so pick the
+        # cycle implementation once instead of branching on every iteration.
+        self._cycle = (
+            self._cycle_integration if INTEGRATION_TEST_MODE else self._cycle_live
+        )
+
         if INTEGRATION_TEST_MODE:
             # Generate in-memory data for the entire S&P subset without hitting
             # external services.  Previous versions limited this to the first
@@ -61,16 +105,26 @@ class StockDataManager:
         else:  # pragma: no cover - requires external services
             self.etoro_tickers_list = EToroTickers().list
             self.ibkr_client = IB()
+        self._tickers_set = set(self.etoro_tickers_list)
+
+        # Cached CSVs are hydrated lazily: the first ``get_all_stock_data`` or
+        # ``start_downloader_agent`` call (or an explicit ``ensure_loaded``)
+        # loads them, so construction does no disk I/O.  Callers such as the
+        # shared memory manager may also call ``load_local_data`` directly.
+
+    def ensure_loaded(self):
+        """Hydrate from the local CSV cache unless that already happened.
 
-        # Always attempt to hydrate from any locally cached CSVs before relying
-        # on live market data.  This enables an offline-first startup path and
-        # also seeds the manager with the full ticker universe discovered in the
-        # cache.
-        self.load_local_data()
+        This keeps the offline-first startup path: cached data and the ticker
+        universe discovered in the cache are available before any live
+        download.
+        """
+        if not self._local_data_attempted:
+            self.load_local_data()
 
 
     def connect_to_ibkr_tws(self):
-        print("Connecting to IBKR TWS")
+        logger.info("Connecting to IBKR TWS")
 
         if INTEGRATION_TEST_MODE:
             if self._offline_data_loaded:
@@ -109,8 +163,8 @@ class StockDataManager:
                             "127.0.0.1", 7496, clientId=client_id
                         )
                     )
-                print(
-                    "Connected to IBKR TWS: " + str(self.ibkr_client.isConnected())
+                logger.info(
+                    "Connected to IBKR TWS: %s", self.ibkr_client.isConnected()
                 )
                 if not self.ibkr_client.isConnected():
                     raise RuntimeError("IBKR connection failed")
@@ -118,11 +172,11 @@ class StockDataManager:
             except Exception as e:  # pragma: no cover - requires real IBKR
                 msg = str(e).lower()
                 if "client id is already in use" in msg and attempt < 4:
-                    print(
-                        f"Client ID {client_id} in use, retrying with a different id"
+                    logger.info(
+                        "Client ID %d in use, retrying with a different id", client_id
                     )
                     continue
-                print(f"Failed to connect to IBKR TWS: {e}")
+                logger.error("Failed to connect to IBKR TWS: %s", e)
                 break
 
         self.notify_listeners_on_ibkr_connection_failed()
@@ -140,12 +194,13 @@ class StockDataManager:
             self.ibkr_client = None
             return
         if self.ibkr_client is not None and self.ibkr_client.isConnected():
-            print("Disconnecting from IBKR TWS")
+            logger.info("Disconnecting from IBKR TWS")
             self.ibkr_client.disconnect()
-            print("Disconnected from IBKR TWS: " + str(self.ibkr_client.isConnected()))
+            logger.info("Disconnected from IBKR TWS: %s", self.ibkr_client.isConnected())
 
     def start_downloader_agent(self):
-        print("Start downloader agent")
+        logger.info("Start downloader agent")
+        self.ensure_loaded()
         if self._offline_data_loaded:
             try:
                 self.reconcile_offline_cache()
@@ -175,7 +230,7 @@ class StockDataManager:
             self._downloader_thread.start()
 
     def stop_downloader_agent(self):
-        print("Stop downloader agent")
+        logger.info("Stop downloader agent")
         self._stop_event.set()
         thread = self._downloader_thread
         if thread and thread.is_alive() and thread is not threading.current_thread():
@@ -184,91 +239,130 @@ class StockDataManager:
             self._downloader_thread = None
 
     def downloader_agent(self, periodicity):
-        print("Downloader agent started, periodicity: " + str(periodicity) + " seconds")
+        logger.info("Downloader agent started, periodicity: %s seconds", periodicity)
         if self._stop_event.wait(1):
             self._downloader_thread = None
             return
         while not self._stop_event.is_set():
-            if not INTEGRATION_TEST_MODE:
-                # Ensure we hold a live IBKR connection before attempting the
-                # expensive download path.  If the connection is unavailable the
-                # manager asks the active client to release it via
-                # ``connect_to_ibkr_tws`` and skips this cycle.
-                if self.ibkr_client is None or not self.ibkr_client.isConnected():
-                    if not self.connect_to_ibkr_tws():
-                        print("Skipping download; IBKR not connected")
-                        if self._stop_event.wait(periodicity):
-                            break
-                        continue
-
-            print("Downloading stock data")
-            self.notify_listeners_on_download_started()
-            self.stock_data_list = StockDataManager.download_stock_data(
-                stock_symbols_list=self.etoro_tickers_list,
-                ibkr_client=self.ibkr_client
-            )
-            self.notify_listeners_on_download_finished()
-            self._stop_event.set()
-            break
+            if self._cycle():
+                self._stop_event.set()
+                break
+            if self._stop_event.wait(periodicity):
+                break
 
         self._downloader_thread = None
 
+    def _cycle_live(self) -> bool:
+        """Run one download cycle; return ``False`` if IBKR is unavailable."""
+        # Ensure we hold a live IBKR connection before attempting the
+        # expensive download path.  If the connection is unavailable the
+        # manager asks the active client to release it via
+        # ``connect_to_ibkr_tws`` and skips this cycle.
+        if self.ibkr_client is None or not self.ibkr_client.isConnected():
+            if not self.connect_to_ibkr_tws():
+                logger.warning("Skipping download; IBKR not connected")
+                return False
+        self._download_cycle()
+        return True
+
+    def _cycle_integration(self) -> bool:
+        """Run one download cycle without checking the IBKR connection."""
+        self._download_cycle()
+        return True
+
+    def _download_cycle(self) -> None:
+        logger.info("Downloading stock data")
+        self.notify_listeners_on_download_started()
+        fresh = self._fresh_cached_entries(CACHE_TTL_SECONDS)
+        if fresh:
+            logger.info(
+                "Reusing %d cached tickers younger than %d seconds",
+                len(fresh),
+                CACHE_TTL_SECONDS,
+            )
+        downloaded = StockDataManager.download_stock_data(
+            stock_symbols_list=[
+                ticker for ticker in self.etoro_tickers_list
+                if ticker not in fresh
+            ],
+            ibkr_client=self.ibkr_client
+        )
+        self.stock_data_list = list(fresh.values()) + downloaded
+        self.notify_listeners_on_download_finished()
+
     @staticmethod
     def download_stock_data(stock_symbols_list, ibkr_client):
         stock_data_list = []
+        started = time.perf_counter()
 
         if ibkr_client is None or not ibkr_client.isConnected():
             raise ValueError("IBKR client not connected")
 
-        for stock_symbol in stock_symbols_list:
+        # Issue the historical requests concurrently on the IBKR connection's
+        # event loop instead of one blocking round-trip per ticker.
+        downloaded = ibkr_client.run(
+            StockData.fetch_many(
+                stock_symbols_list, start_date, cur_date, end_date, period, ibkr_client
+            )
+        )
+
+        # Per-ticker messages are only formatted when DEBUG logging is on.
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for stock_symbol, stock_data in zip(stock_symbols_list, downloaded):
             try:
-                stock_data = StockData(start_date, cur_date, end_date, period, stock_symbol, ibkr_client)
                 if not stock_data.is_data_empty() and stock_data.are_all_data_present():
                     stock_data_list.append(stock_data)
-                    stock_data.print_last_candle_open_close_volume()
-                    print(f"Downloaded data for {stock_symbol}")
-                    print(f"Ticker {stock_symbol} - Last Closing: {stock_data.df['Close'].iloc[-1]}, Last Opening: {stock_data.df['Open'].iloc[-1]}, Last Volume: {stock_data.df['Volume'].iloc[-1]}")
+                    if debug:
+                        stock_data.print_last_candle_open_close_volume()
+                        logger.debug("Downloaded data for %s", stock_symbol)
                 else:
-                    print(f"No valid data for {stock_symbol}")
+                    logger.debug("No valid data for %s", stock_symbol)
             except ValueError as e:
-                print(f"Failed to download data for {stock_symbol}: {e}")
+                logger.warning("Failed to download data for %s: %s", stock_symbol, e)
             except Exception as e:
-                print(f"An unexpected error occurred for {stock_symbol}: {e}")
+                logger.warning("An unexpected error occurred for %s: %s", stock_symbol, e)
 
-        print("Finished downloading stock data")
+        logger.info(
+            "Finished downloading stock data in %.2fs (%d/%d tickers)",
+            time.perf_counter() - started,
+            len(stock_data_list),
+            len(stock_symbols_list),
+        )
         return stock_data_list
 
     def notify_listeners_on_download_started(self):
-        print("Notifying listeners on download started")
+        logger.debug("Notifying listeners on download started")
         self.is_downloading = True
-        for listener in self.scanner_listeners:
+        # Iterate over a snapshot so listeners may (un)register from callbacks.
+        for listener in tuple(self.scanner_listeners):
             listener.on_download_started()
 
     def notify_listeners_on_download_finished(self):
-        print("Notifying listeners on download finished")
+        logger.debug("Notifying listeners on download finished")
         self.is_downloading = False
         if self.stock_data_list:
             self._offline_data_loaded = True
-        for listener in self.scanner_listeners:
+        for listener in tuple(self.scanner_listeners):
             listener.on_download_finished()
 
     def notify_listeners_on_ibkr_connection_failed(self):
         """Inform listeners that the IBKR connection was lost."""
-        for listener in self.scanner_listeners:
+        for listener in tuple(self.scanner_listeners):
             cb = getattr(listener, "on_ibkr_connection_failed", None)
             if cb is not None:
                 cb()
 
     def register_listener(self, listener):
-        print("Registering listener" + str(listener))
+        logger.debug("Registering listener %s", listener)
         self.scanner_listeners.append(listener)
 
     def unregister_listener(self, listener):
-        print("Unregistering listener" + str(listener))
+        logger.debug("Unregistering listener %s", listener)
         self.scanner_listeners.remove(listener)
 
     def get_all_stock_data(self):
-        print("Getting all stock data")
+        logger.debug("Getting all stock data")
+        self.ensure_loaded()
         return self.stock_data_list
 
     # ------------------------------------------------------------------
@@ -277,12 +371,10 @@ class StockDataManager:
     def _generate_random_data(self):
         """Generate a small set of random stock data without external calls."""
         date_str = datetime.now().strftime("%Y-%m-%d")
-        results = []
-        for ticker in self.etoro_tickers_list:
-            price = round(random.uniform(10, 500), 2)
-            volume = random.randint(1_000, 100_000)
-            results.append(_RandomStockData(ticker, price, volume, date_str))
-        return results
+        return [
+            _make_random_stock(ticker, date_str)
+            for ticker in self.etoro_tickers_list
+        ]
 
     # ------------------------------------------------------------------
     # Offline cache helpers
@@ -290,6 +382,7 @@ class StockDataManager:
     def load_local_data(self):
         """Load cached stock data from CSV files if available."""
 
+        self._local_data_attempted = True
         cached_data = []
         try:
             csv_dir = CSV_DATA_DIR
@@ -297,12 +390,41 @@ class StockDataManager:
                 return []
 
             self._cached_ranges.clear()
-            for csv_file in sorted(csv_dir.glob("*.csv")):
-                ticker = csv_file.stem.upper()
+            # A single scandir pass reuses the directory entry's cached file
+            # type instead of globbing and stat-ing every match.
+            with os.scandir(csv_dir) as entries:
+                csv_files = sorted(
+                    entry.path
+                    for entry in entries
+                    if entry.name.endswith(".csv") and entry.is_file()
+                )
+            if not csv_files:
+                return []
+
+            # File reads and pandas' C parser release the GIL, so the cached
+            # CSVs are parsed concurrently.  Results are collected in file
+            # order to keep the loaded list deterministic.
+            max_workers = min(32, (os.cpu_count() or 4) * 4, len(csv_files))
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="csv-loader"
+            ) as pool:
+                pending = []
+                for csv_file in csv_files:
+                    ticker = os.path.splitext(os.path.basename(csv_file))[0].upper()
+                    pending.append(
+                        (
+                            ticker,
+                            pool.submit(
+                                self._load_csv_stock_data, Path(csv_file), ticker
+                            ),
+                        )
+                    )
+
+            for ticker, future in pending:
                 try:
-                    cached_entry = self._load_csv_stock_data(csv_file, ticker)
+                    cached_entry = future.result()
                     cached_data.append(cached_entry)
-                    self._cached_ranges[ticker] = (
+                    self._cached_ranges[ticker] = _Range.of(
                         cached_entry._data["start_date"],
                         cached_entry._data["end_date"],
                     )
@@ -320,44 +442,50 @@ class StockDataManager:
                 self._offline_data_loaded = True
                 # Ensure the cached tickers are part of the tracked universe so
                 # future downloads refresh them as well.
-                combined = list({*self.etoro_tickers_list, *cache_tickers})
-                combined.sort()
-                self.etoro_tickers_list = combined
+                # Only rebuild the sorted universe when the cache contributes
+                # symbols that are not tracked yet.
+                new_tickers = cache_tickers - self._tickers_set
+                if new_tickers:
+                    self._tickers_set |= new_tickers
+                    self.etoro_tickers_list = sorted(self._tickers_set)
 
         return cached_data
 
     def _load_csv_stock_data(self, csv_path: Path, ticker: str):
-        with csv_path.open("r", newline="") as handle:
-            reader = csv.DictReader(handle)
-            rows = []
-            for raw_row in reader:
-                if not raw_row:
-                    continue
-                try:
-                    row = {
-                        "Date": raw_row["Date"],
-                        "Open": float(raw_row["Open"]),
-                        "High": float(raw_row["High"]),
-                        "Low": float(raw_row["Low"]),
-                        "Close": float(raw_row["Close"]),
-                        "Volume": int(float(raw_row["Volume"]))
-                        if raw_row.get("Volume") not in (None, "")
-                        else 0,
-                    }
-                except (KeyError, ValueError) as err:
-                    raise ValueError(
-                        f"Malformed row in {csv_path.name}: {raw_row}"
-                    ) from err
-                rows.append(row)
-
-        if not rows:
-            raise ValueError(f"Cached CSV {csv_path.name} contained no data")
+        rows = _parse_csv_rows(str(csv_path))
 
         start_date = rows[0]["Date"]
         end_date = rows[-1]["Date"]
 
         return _CSVStockData(ticker, rows, start_date, end_date)
 
+    def _fresh_cached_entries(self, ttl_seconds: float) -> Dict[str, object]:
+        """Return loaded entries that can be served without a new download.
+
+        An entry qualifies when its cached CSV is younger than ``ttl_seconds``
+        and its cached rows reach the download's requested end date; a recent
+        file whose reconcile fetch failed is still downloaded again.
+        """
+
+        cutoff = time.time() - ttl_seconds
+        requested_end = end_date.date()
+        fresh = {}
+        for entry in self.stock_data_list:
+            cached_range = self._cached_ranges.get(entry.ticker)
+            if (
+                cached_range is None
+                or cached_range.end_day is None
+                or cached_range.end_day < requested_end
+            ):
+                continue
+            csv_path = CSV_DATA_DIR / f"{entry.ticker}.csv"
+            try:
+                if csv_path.stat().st_mtime >= cutoff:
+                    fresh[entry.ticker] = entry
+            except OSError:
+                continue
+        return fresh
+
     # ------------------------------------------------------------------
     # Offline reconciliation helpers
     # ------------------------------------------------------------------
@@ -394,7 +522,6 @@ class StockDataManager:
 
         self.notify_listeners_on_download_started()
         try:
-            updates: Dict[str, List[dict]] = {}
             for ticker, (start_date_str, end_date_str) in missing_ranges.items():
                 logger.info(
                     "Downloading incremental data for %s from %s to %s",
@@ -402,9 +529,18 @@ class StockDataManager:
                     start_date_str,
                     end_date_str,
                 )
-                stock_data = self._fetch_incremental_data(
-                    ticker, start_date_str, end_date_str
-                )
+            # Overlap the requests on the IBKR connection's event loop.
+            fetched = self.ibkr_client.run(
+                self._fetch_incremental_many(missing_ranges)
+            )
+
+            updates: Dict[str, List[dict]] = {}
+            for ticker, stock_data in zip(missing_ranges, fetched):
+                if isinstance(stock_data, Exception):
+                    logger.warning(
+                        "Incremental download failed for %s: %s", ticker, stock_data
+                    )
+                    continue
                 if stock_data is None:
                     continue
                 if getattr(stock_data, "is_data_empty", lambda: False)():
@@ -430,33 +566,40 @@ class StockDataManager:
         if not self._cached_ranges:
             # Build ranges lazily if ``load_local_data`` was bypassed.
             for entry in self.stock_data_list:
-                data = getattr(entry, "_data", None)
-                if not data:
+                # Cached and synthetic entries expose their payload directly;
+                # only downloaded ``StockData`` objects need the lookup.
+                if isinstance(entry, _CSVStockData):
+                    data = entry._data
+                elif isinstance(entry, _RandomStockData):
+                    data = entry.to_serializable_dict()
+                else:
                     to_dict = getattr(entry, "to_serializable_dict", None)
                     if to_dict is None:
                         continue
                     data = to_dict()
+                if not data:
+                    continue
                 df_rows = data.get("df") or []
                 if not df_rows:
                     continue
-                self._cached_ranges[entry.ticker] = (
+                self._cached_ranges[entry.ticker] = _Range.of(
                     data.get("start_date", df_rows[0]["Date"]),
                     data.get("end_date", df_rows[-1]["Date"]),
                 )
 
+        today_str = today.strftime("%Y-%m-%d")
         ranges: Dict[str, Tuple[str, str]] = {}
-        for ticker, (_, end_date_str) in self._cached_ranges.items():
-            try:
-                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-            except ValueError:
+        for ticker, cached_range in self._cached_ranges.items():
+            end_date = cached_range.end_day
+            if end_date is None:
                 logger.warning(
                     "Cached end date '%s' for %s is invalid; forcing full refresh",
-                    end_date_str,
+                    cached_range.end,
                     ticker,
                 )
                 ranges[ticker] = (
                     (today - timedelta(days=365)).strftime("%Y-%m-%d"),
-                    today.strftime("%Y-%m-%d"),
+                    today_str,
                 )
                 continue
 
@@ -469,23 +612,43 @@ class StockDataManager:
 
             ranges[ticker] = (
                 missing_start.strftime("%Y-%m-%d"),
-                today.strftime("%Y-%m-%d"),
+                today_str,
             )
 
         return ranges
 
-    def _fetch_incremental_data(
-        self, ticker: str, start_date: str, end_date: str
+    async def _fetch_incremental_data_async(
+        self, ticker: str, start_date: str, end_date: str, semaphore=None
     ):
         """Fetch incremental data for ``ticker`` between the supplied dates."""
 
-        return StockData(
+        stock_data = StockData(
             start_date,
             end_date,
             end_date,
             period,
             ticker,
             self.ibkr_client,
+            download=False,
+        )
+        await stock_data.download_market_data_async(semaphore)
+        return stock_data
+
+    async def _fetch_incremental_many(
+        self, missing_ranges: Dict[str, Tuple[str, str]]
+    ) -> list:
+        """Fetch every missing range concurrently, in ``missing_ranges`` order.
+
+        A failing ticker yields its exception instead of aborting the batch.
+        """
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return await asyncio.gather(
+            *(
+                self._fetch_incremental_data_async(ticker, start, end, semaphore)
+                for ticker, (start, end) in missing_ranges.items()
+            ),
+            return_exceptions=True,
         )
 
     def _merge_incremental_rows(self, updates: Dict[str, List[dict]]) -> None:
@@ -500,22 +663,22 @@ class StockDataManager:
         for ticker, rows in updates.items():
             existing = current_entries.get(ticker)
             if existing is None:
-                start_date = rows[0]["Date"]
-                end_date = rows[-1]["Date"]
                 merged_rows = list(rows)
-                updated_entry = _CSVStockData(ticker, merged_rows, start_date, end_date)
+                entry_period = _FIXED_PERIOD
             else:
                 merged_rows = self._merge_rows(existing._data["df"], rows)
-                start_date = merged_rows[0]["Date"]
-                end_date = merged_rows[-1]["Date"]
-                existing._data["df"] = merged_rows
-                existing._data["start_date"] = start_date
-                existing._data["cur_date"] = end_date
-                existing._data["end_date"] = end_date
-                updated_entry = existing
+                entry_period = existing._data["period"]
+            start_date = merged_rows[0]["Date"]
+            end_date = merged_rows[-1]["Date"]
+            # Replace rather than mutate the cached entry: publishers may be
+            # encoding the old payload concurrently, and the shared-memory
+            # manager detects changed entries by payload identity.
+            updated_entry = _CSVStockData(
+                ticker, merged_rows, start_date, end_date, entry_period
+            )
 
             self._persist_csv_rows(ticker, merged_rows)
-            self._cached_ranges[ticker] = (start_date, end_date)
+            self._cached_ranges[ticker] = _Range.of(start_date, end_date)
             current_entries[ticker] = updated_entry
 
         merged_list = list(current_entries.values())
@@ -524,59 +687,222 @@ class StockDataManager:
 
     @staticmethod
     def _merge_rows(existing_rows: Iterable[dict], new_rows: Iterable[dict]) -> List[dict]:
-        """Deduplicate and chronologically order cached and provider rows."""
+        """Deduplicate and chronologically order cached and provider rows.
 
-        merged: Dict[str, dict] = {}
-        for row in existing_rows:
-            merged[row["Date"]] = row
-        for row in new_rows:
-            merged[row["Date"]] = row
+        Provider rows win when both sides carry the same date.
+        """
 
-        return [merged[date] for date in sorted(merged.keys())]
+        existing_rows = list(existing_rows)
+        new_rows = list(new_rows)
+        if not (_dates_sorted(existing_rows) and _dates_sorted(new_rows)):
+            merged: Dict[str, dict] = {}
+            for row in existing_rows:
+                merged[row["Date"]] = row
+            for row in new_rows:
+                merged[row["Date"]] = row
+            return [merged[date] for date in sorted(merged.keys())]
+
+        # Both inputs are in strictly increasing date order (CSV append order
+        # and provider order), so a two-pointer walk produces the union without hashing
+        # or re-sorting.  ISO dates compare correctly as strings.
+        result: List[dict] = []
+        i = j = 0
+        n_existing = len(existing_rows)
+        n_new = len(new_rows)
+        while i < n_existing or j < n_new:
+            if j == n_new or (
+                i < n_existing and existing_rows[i]["Date"] < new_rows[j]["Date"]
+            ):
+                row = existing_rows[i]
+                i += 1
+            else:
+                row = new_rows[j]
+                if i < n_existing and existing_rows[i]["Date"] == row["Date"]:
+                    i += 1
+                j += 1
+            result.append(row)
+        return result
 
     def _persist_csv_rows(self, ticker: str, rows: List[dict]) -> None:
         """Write the merged dataset for ``ticker`` back to the CSV cache."""
 
         csv_path = CSV_DATA_DIR / f"{ticker}.csv"
-        fieldnames = ["Date", "Open", "High", "Low", "Close", "Volume"]
-        with csv_path.open("w", newline="") as handle:
-            writer = csv.DictWriter(handle, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+        # Format every line in one pass (the OHLCV fields never need quoting)
+        # and swap the file in atomically so an interrupted write cannot
+        # leave a truncated cache behind.
+        lines = [",".join(_CSV_COLUMNS)]
+        lines.extend(
+            f"{d},{o},{h},{l},{c},{v}" for d, o, h, l, c, v in map(_row_fields, rows)
+        )
+        lines.append("")
+        text = "\n".join(lines)
+        replace_atomically(csv_path, lambda tmp_path: tmp_path.write_text(text))
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_date(value: str) -> date:
+    """Parse a ``YYYY-MM-DD`` string; memoized since most tickers share one."""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _dates_sorted(rows: List[dict]) -> bool:
+    """Return whether ``rows`` have strictly increasing ``Date`` values."""
+    return all(
+        earlier["Date"] < later["Date"] for earlier, later in zip(rows, rows[1:])
+    )
+
+
+def _check_csv_chunk(frame: "pd.DataFrame", name: str) -> None:
+    """Reject rows with a missing date or price.
+
+    ``read_csv`` turns blank cells into NaN instead of failing, so without
+    this check they would be loaded silently and published as ``NaN``.  A
+    blank Volume is still read as zero.
+    """
+    bad = frame[_REQUIRED_CSV_COLUMNS].isna().any(axis=1)
+    if bad.any():
+        row = frame.loc[bad].iloc[0].to_dict()
+        raise ValueError(f"Malformed row in {name}: {row}")
+
+
+def _parse_csv_rows(path_str: str) -> List[dict]:
+    """Parse a cached OHLCV CSV into row dicts."""
+    name = os.path.basename(path_str)
+    # Let pandas' C parser tokenize and coerce the numeric columns instead
+    # of converting every field of every row in Python.  The file is read
+    # in chunks so only one chunk's frame is alive next to the row list.
+    rows: List[dict] = []
+    try:
+        with pd.read_csv(
+            path_str,
+            usecols=_CSV_COLUMNS,
+            dtype=_CSV_DTYPES,
+            engine="c",
+            chunksize=_CSV_CHUNK_ROWS,
+        ) as chunks:
+            for frame in chunks:
+                _check_csv_chunk(frame, name)
+                volumes = frame["Volume"].fillna(0).astype("int64")
+                rows.extend(
+                    {
+                        "Date": date,
+                        "Open": open_,
+                        "High": high,
+                        "Low": low,
+                        "Close": close,
+                        "Volume": volume,
+                    }
+                    for date, open_, high, low, close, volume in zip(
+                        frame["Date"].tolist(),
+                        frame["Open"].tolist(),
+                        frame["High"].tolist(),
+                        frame["Low"].tolist(),
+                        frame["Close"].tolist(),
+                        volumes.tolist(),
+                    )
+                )
+    except (KeyError, ValueError) as err:
+        raise ValueError(f"Malformed cached CSV {name}: {err}") from err
+
+    if not rows:
+        raise ValueError(f"Cached CSV {name} contained no data")
+
+    return rows
+
+
+@lru_cache(maxsize=1024)
+def _make_random_stock(ticker: str, date_str: str) -> "_RandomStockData":
+    """Return the random quote for ``ticker`` on ``date_str``.
+
+    Memoized so repeated integration-mode downloads on the same day reuse the
+    existing objects; a new day yields fresh quotes.
+    """
+    price = round(_RNG.uniform(10, 500), 2)
+    volume = _RNG.randint(1_000, 100_000)
+    return _RandomStockData(ticker, price, volume, date_str)
+
+
+def refresh_random_cache() -> None:
+    """Discard memoized integration-mode quotes so new ones are generated."""
+    _make_random_stock.cache_clear()
+
+
+@dataclass(frozen=True, slots=True)
+class _Range:
+    """Span of a ticker's cached rows, with the end date parsed once."""
+
+    start: str
+    end: str
+    # ``None`` when ``end`` is not a valid ``YYYY-MM-DD`` string.
+    end_day: Optional[date]
+
+    @classmethod
+    def of(cls, start: str, end: str) -> "_Range":
+        try:
+            end_day = _parse_iso_date(end)
+        except ValueError:
+            end_day = None
+        return cls(start, end, end_day)
+
+
+_Candle = namedtuple("_Candle", "Date Open High Low Close Volume")
 
 
 class _RandomStockData:
     """Lightweight stock data holder used in integration-test mode."""
 
-    def __init__(self, ticker: str, price: float, volume: int, date: str):
+    __slots__ = ("ticker", "df", "_candle", "_period", "_serialized", "_json")
+
+    def __init__(
+        self,
+        ticker: str,
+        price: float,
+        volume: int,
+        date: str,
+        period: str = _FIXED_PERIOD,
+    ):
         self.ticker = ticker
         self.df = None
-        self._data = {
-            "ticker": ticker,
-            "start_date": date,
-            "cur_date": date,
-            "end_date": date,
-            "period": "1 D",
-            "df": [
-                {
-                    "Date": date,
-                    "Open": price,
-                    "High": price,
-                    "Low": price,
-                    "Close": price,
-                    "Volume": volume,
-                }
-            ],
-        }
+        # Keep the single synthetic bar compact; the nested payload is only
+        # built when the entry is first serialized.
+        self._candle = _Candle(date, price, price, price, price, volume)
+        self._period = period
+        self._serialized = None
+        self._json = None
 
     def to_serializable_dict(self):
-        return self._data
+        if self._serialized is None:
+            date = self._candle.Date
+            self._serialized = {
+                "ticker": self.ticker,
+                "start_date": date,
+                "cur_date": date,
+                "end_date": date,
+                "period": self._period,
+                "df": [self._candle._asdict()],
+            }
+        return self._serialized
+
+    def to_json_bytes(self) -> bytes:
+        """Return the serialized payload as cached compact JSON bytes."""
+        if self._json is None:
+            self._json = dumps(self.to_serializable_dict())
+        return self._json
 
 
 class _CSVStockData:
     """Stock data backed by on-disk CSV caches."""
 
-    def __init__(self, ticker: str, rows, start_date: str, end_date: str):
+    __slots__ = ("ticker", "df", "_data", "_json")
+
+    def __init__(
+        self,
+        ticker: str,
+        rows,
+        start_date: str,
+        end_date: str,
+        period: str = _FIXED_PERIOD,
+    ):
         self.ticker = ticker
         self.df = None
         self._data = {
@@ -584,9 +910,19 @@ class _CSVStockData:
             "start_date": start_date,
             "cur_date": end_date,
             "end_date": end_date,
-            "period": "1 D",
+            "period": period,
             "df": rows,
         }
+        self._json = None
 
     def to_serializable_dict(self):
         return self._data
+
+    def to_json_bytes(self) -> bytes:
+        """Return ``_data`` as cached compact JSON bytes.
+
+        Entries are treated as immutable; updates build a new entry.
+        """
+        if self._json is None:
+            self._json = dumps(self._data)
+        return self._json
@@ -10,6 +10,7 @@ from shared_memory.columnar_layout import (
     read_header,
     write_header,
     column_views,
+    header_view,
     ring_slice,
 )
 
@@ -38,3 +39,19 @@ def test_ring_slice():
     arr = np.array([0, 1, 2, 3, 4])
     assert ring_slice(arr, 3, 1, 5).tolist() == [3, 4, 0]
     assert ring_slice(arr, 0, 0, 5).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_header_view_aliases_header():
+    tl = compute_layout(8, 4)
+    mv = memoryview(bytearray(tl.end))
+    write_header(mv, tl, 1, tl.capacity, 123, 2)
+    hdr = header_view(mv, tl)
+    assert int(hdr["last_ts"][0]) == 123
+    hdr["seqlock"] += 1
+    hdr["write_idx"] = 3
+    assert read_header(mv, tl) == {
+        "write_idx": 3,
+        "capacity": 4,
+        "last_ts": 123,
+        "seqlock": 3,
+    }
@@ -1,6 +1,8 @@
 import pathlib
 import sys
 
+import numpy as np
+
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
 from shared_memory.columnar_writer import ColumnarWriter
@@ -40,3 +42,90 @@ def test_view_last_n_and_since():
         reader.close()
         writer.close()
         writer.unlink()
+
+
+def test_view_since_before_wrap():
+    writer, reader = _build("shm_test_since", 5)
+    try:
+        for i in range(1, 4):
+            writer.append("TEST", i * 100, float(i), float(i), float(i), float(i), i)
+        ts, o, *_ = reader.view_since("TEST", 100)
+        assert ts.tolist() == [200, 300]
+        assert o.tolist() == [2.0, 3.0]
+        assert reader.view_since("TEST", 300)[0].tolist() == []
+    finally:
+        reader.close()
+        writer.close()
+        writer.unlink()
+
+
+def test_append_many_wraps_like_append():
+    writer, reader = _build("shm_test_many", 5)
+    try:
+        ts = np.arange(7, dtype=np.int64)
+        px = ts.astype(np.float32)
+        assert writer.append_many("TEST", ts, px, px, px, px, ts * 10) == (2, 6)
+
+        ts_out, o, *_, v = reader.view_last_n("TEST", 5)
+        assert ts_out.tolist() == [2, 3, 4, 5, 6]
+        assert v.tolist() == [20, 30, 40, 50, 60]
+
+        more = np.array([7, 8, 9, 10], dtype=np.int64)
+        mpx = more.astype(np.float32)
+        assert writer.append_many("TEST", more, mpx, mpx, mpx, mpx, more) == (1, 10)
+        assert reader.view_last_n("TEST", 5)[0].tolist() == [6, 7, 8, 9, 10]
+    finally:
+        reader.close()
+        writer.close()
+        writer.unlink()
+
+
+def test_shared_memory_manager_appends_only_new_bars():
+    from threading import Lock
+
+    from shared_memory.shared_memory_manager import SharedMemoryManager
+
+    class _Manager:
+        def register_listener(self, listener):
+            pass
+
+        def start_downloader_agent(self):
+            pass
+
+    class _Stock:
+        def __init__(self, rows):
+            self.ticker = "TEST"
+            self.df = None
+            self._data = {"ticker": "TEST", "df": rows}
+
+        def to_serializable_dict(self):
+            return self._data
+
+    def _row(day, price):
+        return {
+            "Date": f"2024-01-0{day}",
+            "Open": price,
+            "High": price,
+            "Low": price,
+            "Close": price,
+            "Volume": day,
+        }
+
+    writer, reader = _build("shm_test_smm", 8)
+    try:
+        smm = SharedMemoryManager(
+            {}, Lock(), _Manager(), shm=None, columnar_writer=writer
+        )
+        smm.write_data([_Stock([_row(1, 1.0), _row(2, 2.0)])])
+        smm.write_data([_Stock([_row(1, 1.0), _row(2, 2.0), _row(3, 3.0)])])
+
+        cols = reader.view_last_n("TEST", 3)
+        closes, volumes = cols[4].tolist(), cols[5].tolist()
+        del cols
+        assert closes == [1.0, 2.0, 3.0]
+        assert volumes == [1, 2, 3]
+        assert int(writer.headers["TEST"]["write_idx"][0]) == 3
+    finally:
+        reader.close()
+        writer.close()
+        writer.unlink()
@@ -34,3 +34,57 @@ def test_retry_different_client_ids(monkeypatch):
     mgr = sdm.StockDataManager()
     assert mgr.connect_to_ibkr_tws() is True
     assert mgr.ibkr_client.calls == [1, 2, 3, 4, 5]
+
+
+def test_live_cycle_skips_download_without_connection(monkeypatch):
+    monkeypatch.setattr(sdm, "INTEGRATION_TEST_MODE", False)
+    monkeypatch.setattr(sdm, "IB", DummyIB)
+    monkeypatch.setattr(sdm, "EToroTickers", DummyTickers)
+
+    mgr = sdm.StockDataManager()
+    assert mgr._cycle == mgr._cycle_live
+
+    downloads = []
+    mgr._download_cycle = lambda: downloads.append(True)
+    mgr.connect_to_ibkr_tws = lambda: False
+    assert mgr._cycle() is False
+    assert downloads == []
+
+    mgr.ibkr_client.connected = True
+    assert mgr._cycle() is True
+    assert downloads == [True]
+
+
+class _FakeDownload:
+    def __init__(self, ticker, empty=False):
+        self.ticker = ticker
+        self.empty = empty
+
+    def is_data_empty(self):
+        return self.empty
+
+    def are_all_data_present(self):
+        return True
+
+    def print_last_candle_open_close_volume(self):
+        pass
+
+
+def test_download_stock_data_logs_single_summary(monkeypatch, caplog):
+    class FakeStockData:
+        @staticmethod
+        async def fetch_many(tickers, *args):
+            return [_FakeDownload(t, empty=(t == "BAD")) for t in tickers]
+
+    client = DummyIB()
+    client.connected = True
+    client.run = asyncio.run
+    monkeypatch.setattr(sdm, "StockData", FakeStockData)
+
+    with caplog.at_level("INFO", logger=sdm.__name__):
+        result = sdm.StockDataManager.download_stock_data(["AAPL", "BAD"], client)
+
+    assert [s.ticker for s in result] == ["AAPL"]
+    assert len(caplog.messages) == 1
+    assert caplog.messages[0].startswith("Finished downloading stock data in ")
+    assert caplog.messages[0].endswith("(1/2 tickers)")
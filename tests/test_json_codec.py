@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from utils import json_codec
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def codec(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    return json_codec
+
+
+def test_backends_encode_identically(codec):
+    np = pytest.importorskip("numpy")
+    payload = {
+        "ticker": "AAPL",
+        "when": datetime(2024, 1, 2, 3, 4, 5),
+        "df": [{"Close": np.float64(1.5), "Volume": np.int64(7)}],
+        "gap": float("nan"),
+    }
+    assert codec.dumps(payload) == (
+        b'{"ticker":"AAPL","when":"2024-01-02T03:04:05",'
+        b'"df":[{"Close":1.5,"Volume":7}],"gap":null}'
+    )
+
+
+def test_loads_raises_json_decode_error(codec):
+    assert codec.loads(b'{"a":1}') == {"a": 1}
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b'{"a":')
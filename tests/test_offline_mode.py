@@ -1,4 +1,6 @@
+import asyncio
 import csv
+import os
 import sys
 import threading
 import time
@@ -7,6 +9,8 @@ from threading import Lock
 
 from multiprocessing import shared_memory
 
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from shared_memory.shared_memory_manager import SharedMemoryManager
@@ -72,6 +76,7 @@ def test_integration_mode_skips_ibkr_connection(monkeypatch, tmp_path, caplog):
         writer.writerow(["2024-02-01", 100.0, 110.0, 95.0, 105.0, 2000])
 
     manager = StockDataManager()
+    manager.ensure_loaded()
 
     with caplog.at_level("INFO"):
         result = manager.connect_to_ibkr_tws()
@@ -96,6 +101,7 @@ def test_reconcile_offline_cache_appends_missing_rows(monkeypatch, tmp_path, cap
         writer.writerow(["2024-01-01", 10.0, 12.0, 9.5, 11.5, 1500])
 
     manager = StockDataManager()
+    manager.ensure_loaded()
     manager.start_downloader_agent = lambda: None
 
     # Pretend that the runtime is now operating outside integration mode so
@@ -106,6 +112,8 @@ def test_reconcile_offline_cache_appends_missing_rows(monkeypatch, tmp_path, cap
     )
 
     class _ConnectedClient:
+        run = staticmethod(asyncio.run)
+
         def isConnected(self):
             return True
 
@@ -135,7 +143,10 @@ def test_reconcile_offline_cache_appends_missing_rows(monkeypatch, tmp_path, cap
                 "df": list(new_rows),
             }
 
-    manager._fetch_incremental_data = lambda *args, **kwargs: _StubStockData("AAPL")
+    async def _fetch_stub(ticker, start_date, end_date, semaphore=None):
+        return _StubStockData(ticker)
+
+    manager._fetch_incremental_data_async = _fetch_stub
 
     with caplog.at_level("INFO"):
         manager.reconcile_offline_cache()
@@ -188,3 +199,267 @@ def test_real_mode_downloader_runs_in_background(monkeypatch, tmp_path):
     assert start_event.wait(1), "Background downloader thread did not run"
 
     manager.stop_downloader_agent()
+
+
+def test_fresh_cached_entries_respect_ttl(monkeypatch, tmp_path):
+    monkeypatch.setattr(paths, "CSV_DATA_DIR", tmp_path)
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+
+    from stock import stock_data_manager as sdm
+
+    today = sdm.end_date.strftime("%Y-%m-%d")
+    # NVDA's file was just written but its rows stop short of the requested
+    # end date (e.g. its reconcile fetch failed), so it is not fresh.
+    for ticker, last_date in (("AAPL", today), ("MSFT", today), ("NVDA", "2024-01-01")):
+        with (tmp_path / f"{ticker}.csv").open("w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["Date", "Open", "High", "Low", "Close", "Volume"])
+            writer.writerow([last_date, 10.0, 12.0, 9.5, 11.5, 1500])
+
+    stale = time.time() - 2 * 24 * 60 * 60
+    os.utime(tmp_path / "MSFT.csv", (stale, stale))
+
+    manager = StockDataManager()
+    manager.ensure_loaded()
+    fresh = manager._fresh_cached_entries(24 * 60 * 60)
+
+    assert set(fresh) == {"AAPL"}
+    assert fresh["AAPL"].ticker == "AAPL"
+
+
+def test_load_local_data_keeps_file_order_and_skips_bad_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(paths, "CSV_DATA_DIR", tmp_path)
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+
+    for ticker in ("MSFT", "AAPL", "NVDA", "GOOG"):
+        with (tmp_path / f"{ticker}.csv").open("w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["Date", "Open", "High", "Low", "Close", "Volume"])
+            writer.writerow(["2024-01-01", 10.0, 12.0, 9.5, 11.5, 1500])
+    (tmp_path / "BAD.csv").write_text("Date,Open\n2024-01-01,oops\n")
+
+    manager = StockDataManager()
+    manager.ensure_loaded()
+
+    assert [entry.ticker for entry in manager.stock_data_list] == [
+        "AAPL",
+        "GOOG",
+        "MSFT",
+        "NVDA",
+    ]
+    assert "BAD" not in manager._cached_ranges
+
+
+def test_load_local_data_extends_universe_only_with_new_tickers(monkeypatch, tmp_path):
+    monkeypatch.setattr(paths, "CSV_DATA_DIR", tmp_path)
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+
+    with (tmp_path / "AAPL.csv").open("w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["Date", "Open", "High", "Low", "Close", "Volume"])
+        writer.writerow(["2024-01-01", 10.0, 12.0, 9.5, 11.5, 1500])
+
+    manager = StockDataManager()
+    manager.ensure_loaded()
+    assert [entry.ticker for entry in manager.stock_data_list] == ["AAPL"]
+    # AAPL is already tracked, so the configured order is left alone.
+    assert manager.etoro_tickers_list == manager.sp500_tickers_list
+
+    with (tmp_path / "ZZZZ.csv").open("w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["Date", "Open", "High", "Low", "Close", "Volume"])
+        writer.writerow(["2024-01-01", 1.0, 1.0, 1.0, 1.0, 1])
+
+    manager.load_local_data()
+    assert manager.etoro_tickers_list == sorted(
+        [*manager.sp500_tickers_list, "ZZZZ"]
+    )
+
+
+def test_cached_data_loads_on_first_query(monkeypatch, tmp_path):
+    monkeypatch.setattr(paths, "CSV_DATA_DIR", tmp_path)
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+    (tmp_path / "AAPL.csv").write_text(
+        "Date,Open,High,Low,Close,Volume\n2024-01-01,10.0,12.0,9.5,11.5,1500\n"
+    )
+
+    manager = StockDataManager()
+    assert manager.stock_data_list == []
+
+    assert [entry.ticker for entry in manager.get_all_stock_data()] == ["AAPL"]
+
+
+def test_missing_ranges_built_from_loaded_entries(monkeypatch, tmp_path):
+    from stock import stock_data_manager as sdm
+
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+    manager = StockDataManager()
+    manager.stock_data_list = [
+        sdm._CSVStockData(
+            "AAPL", [{"Date": "2024-01-01"}, {"Date": "2024-01-05"}],
+            "2024-01-01", "2024-01-05",
+        ),
+        sdm._RandomStockData("MSFT", 10.0, 100, "2024-01-03"),
+    ]
+    manager._cached_ranges.clear()
+
+    ranges = manager._determine_missing_ranges()
+
+    assert manager._cached_ranges == {
+        "AAPL": sdm._Range.of("2024-01-01", "2024-01-05"),
+        "MSFT": sdm._Range.of("2024-01-03", "2024-01-03"),
+    }
+    assert manager._cached_ranges["AAPL"].end_day.isoformat() == "2024-01-05"
+    assert ranges["AAPL"][0] == "2024-01-06"
+    assert ranges["MSFT"][0] == "2024-01-04"
+
+
+def test_merge_rows_prefers_provider_rows_and_keeps_order():
+    existing = [{"Date": "2024-01-01", "Close": 1}, {"Date": "2024-01-03", "Close": 3}]
+    new = [{"Date": "2024-01-02", "Close": 2}, {"Date": "2024-01-03", "Close": 30}]
+
+    merged = StockDataManager._merge_rows(existing, new)
+    assert [(row["Date"], row["Close"]) for row in merged] == [
+        ("2024-01-01", 1),
+        ("2024-01-02", 2),
+        ("2024-01-03", 30),
+    ]
+
+    # Out-of-order or duplicated cached rows still merge correctly.
+    unsorted = [{"Date": "2024-01-03", "Close": 3}, {"Date": "2024-01-01", "Close": 1}]
+    assert [row["Date"] for row in StockDataManager._merge_rows(unsorted, new)] == [
+        "2024-01-01",
+        "2024-01-02",
+        "2024-01-03",
+    ]
+
+
+def test_reconcile_fetches_missing_ranges_concurrently(monkeypatch, tmp_path):
+    from stock import stock_data_manager as sdm
+
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+    manager = StockDataManager()
+    monkeypatch.setattr(sdm, "INTEGRATION_TEST_MODE", False)
+
+    in_flight = []
+    peak = []
+
+    class _AsyncStockData:
+        def __init__(self, start_date, cur_date, end_date, period, ticker,
+                     ibkr_client, download=True):
+            self.ticker = ticker
+            self.end_date = end_date
+
+        async def download_market_data_async(self, semaphore=None):
+            async with semaphore:
+                in_flight.append(self.ticker)
+                peak.append(len(in_flight))
+                await asyncio.sleep(0)
+                in_flight.remove(self.ticker)
+            if self.ticker == "FAIL":
+                raise RuntimeError("boom")
+
+        def is_data_empty(self):
+            return False
+
+        def to_serializable_dict(self):
+            row = {"Date": self.end_date, "Open": 1.0, "High": 1.0,
+                   "Low": 1.0, "Close": 1.0, "Volume": 1}
+            return {"df": [row]}
+
+    class _Client:
+        run = staticmethod(asyncio.run)
+
+        def isConnected(self):
+            return True
+
+    monkeypatch.setattr(sdm, "StockData", _AsyncStockData)
+    manager._local_data_attempted = True
+    manager._offline_data_loaded = True
+    manager.ibkr_client = _Client()
+    manager.stock_data_list = [
+        sdm._CSVStockData(
+            t,
+            [{"Date": "2024-01-01", "Open": 1.0, "High": 1.0,
+              "Low": 1.0, "Close": 1.0, "Volume": 1}],
+            "2024-01-01",
+            "2024-01-01",
+        )
+        for t in ("AAPL", "FAIL", "MSFT")
+    ]
+    manager._determine_missing_ranges = lambda: {
+        t: ("2024-01-02", "2024-01-02") for t in ("AAPL", "FAIL", "MSFT")
+    }
+
+    manager.reconcile_offline_cache()
+
+    assert max(peak) == 3
+    ends = {e.ticker: e._data["end_date"] for e in manager.stock_data_list}
+    assert ends == {"AAPL": "2024-01-02", "FAIL": "2024-01-01", "MSFT": "2024-01-02"}
+    assert (tmp_path / "AAPL.csv").exists()
+    assert not (tmp_path / "FAIL.csv").exists()
+    assert (tmp_path / "AAPL.csv").read_text().splitlines() == [
+        "Date,Open,High,Low,Close,Volume",
+        "2024-01-01,1.0,1.0,1.0,1.0,1",
+        "2024-01-02,1.0,1.0,1.0,1.0,1",
+    ]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_blank_price_or_date_cells_reject_cached_csv(monkeypatch, tmp_path):
+    monkeypatch.setattr(paths, "CSV_DATA_DIR", tmp_path)
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+    header = "Date,Open,High,Low,Close,Volume\n"
+    (tmp_path / "AAPL.csv").write_text(header + "2024-01-01,,12,9,11,100\n")
+    (tmp_path / "MSFT.csv").write_text(header + ",10,12,9,11,100\n")
+    (tmp_path / "GOOG.csv").write_text(header + "2024-01-01,10,12,9,11,\n")
+    # Dates are not validated on load; a non-ISO end date forces a full
+    # refresh during reconciliation instead.
+    (tmp_path / "NVDA.csv").write_text(header + "01/02/2024,10,12,9,11,100\n")
+
+    manager = StockDataManager()
+    for ticker in ("AAPL", "MSFT"):
+        with pytest.raises(ValueError, match="Malformed row"):
+            manager._load_csv_stock_data(tmp_path / f"{ticker}.csv", ticker)
+
+    manager.ensure_loaded()
+    assert [entry.ticker for entry in manager.stock_data_list] == ["GOOG", "NVDA"]
+    assert manager.stock_data_list[0]._data["df"][0]["Volume"] == 0
+    assert manager._cached_ranges["NVDA"].end_day is None
+    assert "NVDA" in manager._determine_missing_ranges()
+
+
+def test_merge_replaces_cached_entry_instead_of_mutating(monkeypatch, tmp_path):
+    from stock import stock_data_manager as sdm
+
+    monkeypatch.setattr(
+        "stock.stock_data_manager.CSV_DATA_DIR", tmp_path, raising=False
+    )
+    row = {"Date": "2024-01-01", "Open": 1.0, "High": 1.0,
+           "Low": 1.0, "Close": 1.0, "Volume": 1}
+    old = sdm._CSVStockData("AAPL", [row], "2024-01-01", "2024-01-01")
+    old_json = old.to_json_bytes()
+
+    manager = StockDataManager()
+    manager.stock_data_list = [old]
+    manager._merge_incremental_rows({"AAPL": [dict(row, Date="2024-01-02")]})
+
+    (new,) = manager.stock_data_list
+    assert new is not old
+    assert old.to_json_bytes() == old_json
+    assert old._data["end_date"] == "2024-01-01"
+    assert b'"end_date":"2024-01-02"' in new.to_json_bytes()
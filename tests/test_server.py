@@ -105,6 +105,15 @@ def test_server_endpoints():
         # get_shm_name
         resp = await send_request(port, {"v": 1, "id": "shm", "type": "get_shm_name"})
         assert resp["data"]["shm_name"] == smm.shm_name
+        assert resp["id"] == "shm" and resp["op"] == "get_shm_name"
+
+        # get_snapshot_epoch
+        resp = await send_request(port, {"v": 1, "id": 7, "type": "get_snapshot_epoch"})
+        assert resp["id"] == 7
+        assert resp["data"] == {
+            "epoch": smm.snapshot_state["epoch"],
+            "last_update_ms": smm.snapshot_state["last_update_ms"],
+        }
 
         # list_tickers
         resp = await send_request(port, {"v": 1, "id": "1", "type": "list_tickers"})
@@ -210,3 +219,188 @@ def test_get_shm_name_unconfigured():
         await srv.wait_closed()
 
     asyncio.run(run_test())
+
+
+def test_list_tickers_refreshes_after_write():
+    async def run_test():
+        shared_dict = {}
+        lock = Lock()
+        fdm = FakeDataManager([FakeStockData("AAPL", 100.0, 10)])
+        smm = SharedMemoryManager(shared_dict, lock, fdm, shm=None)
+
+        server = NDJSONServer(smm.quote_cache, smm.snapshot_state, None)
+        srv = await server.start("127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+
+        resp = await send_request(port, {"v": 1, "id": "1", "type": "list_tickers"})
+        assert resp["data"] == ["AAPL"]
+
+        smm.write_data([FakeStockData("MSFT", 200.0, 20)])
+        resp = await send_request(port, {"v": 1, "id": "2", "type": "list_tickers"})
+        assert set(resp["data"]) == {"AAPL", "MSFT"}
+
+        srv.close()
+        await srv.wait_closed()
+
+    asyncio.run(run_test())
+
+
+def test_pipelined_requests_receive_all_responses():
+    async def run_test():
+        fdm = FakeDataManager([FakeStockData("AAPL", 100.0, 10)])
+        smm = SharedMemoryManager({}, Lock(), fdm, shm=None)
+        server = NDJSONServer(smm.quote_cache, smm.snapshot_state, None)
+        srv = await server.start("127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        requests = [
+            {"v": 1, "id": i, "type": "get_quote", "ticker": "AAPL"} for i in range(3)
+        ]
+        writer.write(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        assert [r["id"] for r in responses] == [0, 1, 2]
+        assert all(r["data"]["price"] == 100.0 for r in responses)
+
+        writer.close()
+        await writer.wait_closed()
+        srv.close()
+        await srv.wait_closed()
+
+    asyncio.run(run_test())
+
+
+def test_pipelined_burst_is_written_once_before_blocking():
+    class _CountingWriter:
+        transport = None
+
+        def __init__(self):
+            self.writes = []
+            self.drains = 0
+
+        def get_extra_info(self, name):
+            return ("test", 0)
+
+        def write(self, data):
+            self.writes.append(data)
+
+        async def drain(self):
+            self.drains += 1
+
+        def close(self):
+            pass
+
+        async def wait_closed(self):
+            pass
+
+    def _lines(ids):
+        return b"".join(
+            json.dumps({"v": 1, "id": i, "type": "get_quote", "ticker": "AAPL"}).encode()
+            + b"\n"
+            for i in ids
+        )
+
+    async def run_test():
+        quote_cache = {"AAPL": {"ticker": "AAPL", "price": 1.0, "ts_epoch_ms": 0}}
+        server = NDJSONServer(quote_cache, {"epoch": 0, "last_update_ms": 0}, None)
+        reader = asyncio.StreamReader()
+        writer = _CountingWriter()
+        reader.feed_data(_lines(range(3)))
+        task = asyncio.create_task(server.handle_client(reader, writer))
+
+        for _ in range(10):
+            await asyncio.sleep(0)
+        # The whole burst went out in one write while the handler waits for
+        # more input.
+        assert len(writer.writes) == 1
+        assert [json.loads(l)["id"] for l in writer.writes[0].splitlines()] == [0, 1, 2]
+        drains_after_burst = writer.drains
+
+        reader.feed_data(_lines([3]))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert len(writer.writes) == 2
+        assert json.loads(writer.writes[1])["id"] == 3
+        assert writer.drains == drains_after_burst + 1
+
+        reader.feed_eof()
+        await task
+        assert len(writer.writes) == 2
+
+    asyncio.run(run_test())
+
+
+def test_clock_timer_is_replaced_on_restart_and_stopped():
+    async def run_test():
+        server = NDJSONServer({}, {"epoch": 0, "last_update_ms": 0}, None)
+        srv = await server.start("127.0.0.1", 0)
+        first = server._tick_handle
+        srv2 = await server.start("127.0.0.1", 0)
+        assert first.cancelled()
+        assert not server._tick_handle.cancelled()
+
+        for s in (srv, srv2):
+            s.close()
+            await s.wait_closed()
+        handle = server._tick_handle
+        server.stop_clock()
+        assert handle.cancelled() and server._tick_handle is None
+
+    asyncio.run(run_test())
+
+
+def test_long_pipelined_burst_yields_to_other_tasks():
+    class _Writer:
+        transport = None
+
+        def __init__(self):
+            self.responses = 0
+
+        def get_extra_info(self, name):
+            return ("test", 0)
+
+        def write(self, data):
+            self.responses += data.count(b"\n")
+
+        async def drain(self):
+            pass
+
+        def close(self):
+            pass
+
+        async def wait_closed(self):
+            pass
+
+    async def run_test():
+        quote_cache = {"AAPL": {"ticker": "AAPL", "price": 1.0, "ts_epoch_ms": 0}}
+        server = NDJSONServer(
+            quote_cache, {"epoch": 0, "last_update_ms": 0}, None, max_burst_requests=50
+        )
+        reader = asyncio.StreamReader()
+        writer = _Writer()
+        reader.feed_data(
+            b"".join(
+                json.dumps({"v": 1, "id": i, "type": "get_quote", "ticker": "AAPL"}).encode()
+                + b"\n"
+                for i in range(200)
+            )
+        )
+        reader.feed_eof()
+
+        observed = []
+
+        async def competitor():
+            while len(observed) < 100 and writer.responses < 200:
+                observed.append(writer.responses)
+                await asyncio.sleep(0)
+
+        other = asyncio.create_task(competitor())
+        await server.handle_client(reader, writer)
+        await other
+
+        assert writer.responses == 200
+        # The competing task ran while the burst was still being served.
+        assert any(0 < seen < 200 for seen in observed)
+
+    asyncio.run(run_test())
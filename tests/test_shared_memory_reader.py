@@ -60,3 +60,39 @@ def test_read_from_real_shared_memory():
 
     shm.close()
     shm.unlink()
+
+
+def test_get_stock_retries_when_segment_changes_between_reads():
+    shm = shared_memory.SharedMemory(create=True, size=10_000, name="test_reader_retry")
+    smm = SharedMemoryManager({}, Lock(), DummyDataManager(), shm)
+    smm.write_data([FakeStockData("AAPL")])
+
+    reader = StockDataReader("127.0.0.1", 12345, shm_name=shm.name)
+    stable = reader._read_raw()
+    reads = iter([stable, stable + b" ", stable, stable])
+    reader._read_raw = lambda: next(reads)
+
+    data = reader.get_stock("AAPL")
+    assert data["ticker"] == "AAPL"
+    assert next(reads, None) is None
+    reader.close()
+
+    shm.close()
+    shm.unlink()
+
+
+def test_reader_ignores_stale_bytes_after_shorter_payload():
+    shm = shared_memory.SharedMemory(create=True, size=10_000, name="test_reader_prefix")
+    shared_dict = {}
+    smm = SharedMemoryManager(shared_dict, Lock(), DummyDataManager(), shm)
+    smm.write_data([FakeStockData(t) for t in ("AAPL", "MSFT", "GOOG")])
+    shared_dict.clear()
+    smm.write_data([FakeStockData("AAPL")])
+
+    reader = StockDataReader("127.0.0.1", 12345, shm_name=shm.name)
+    assert reader.list_tickers() == ["AAPL"]
+    assert reader.get_stock("AAPL")["ticker"] == "AAPL"
+    reader.close()
+
+    shm.close()
+    shm.unlink()
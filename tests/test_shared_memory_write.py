@@ -1,13 +1,24 @@
+import threading
+import time
 from threading import Lock
 import json
+import struct
+from concurrent.futures import Future
 from datetime import datetime
 import logging
 
+import pytest
+
 from multiprocessing import shared_memory
 
 from shared_memory.shared_memory_manager import SharedMemoryManager
 
 
+def _read_segment(shm):
+    (length,) = struct.unpack_from("<I", shm.buf, 0)
+    return json.loads(bytes(shm.buf[4 : 4 + length]))
+
+
 class DummyDataManager:
     def register_listener(self, listener):
         pass
@@ -80,8 +91,7 @@ def test_write_data_populates_shared_memory_and_cache():
         assert smm.quote_cache[ticker]["price"] == price
 
     # Ensure payload persisted to the shared-memory segment
-    raw = bytes(shm.buf).rstrip(b"\x00")
-    stored = json.loads(raw.decode("utf-8"))
+    stored = _read_segment(shm)
     assert "AAPL" in stored and "MSFT" in stored
 
     assert smm.snapshot_state["epoch"] % 2 == 0
@@ -102,8 +112,7 @@ def test_write_data_serializes_datetime_fields():
 
     smm.write_data([FakeDateTimeStockData("AAPL")])
 
-    raw = bytes(shm.buf).rstrip(b"\x00")
-    stored = json.loads(raw.decode("utf-8"))
+    stored = _read_segment(shm)
     assert stored["AAPL"]["data"]["start_date"] == "2024-01-01T00:00:00"
 
     shm.close()
@@ -139,9 +148,221 @@ def test_write_data_resizes_shared_memory_when_needed():
     smm.write_data([big])
 
     assert smm.shared_mem.size > 128
-    raw = bytes(smm.shared_mem.buf).rstrip(b"\x00")
-    stored = json.loads(raw.decode("utf-8"))
+    stored = _read_segment(smm.shared_mem)
     assert "BIG" in stored
 
     smm.shared_mem.close()
     smm.shared_mem.unlink()
+
+
+def test_write_data_saves_csv_outside_lock(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        "shared_memory.shared_memory_manager.CSV_DATA_DIR", tmp_path
+    )
+    lock = Lock()
+    smm = SharedMemoryManager({}, lock, DummyDataManager(), shm=None)
+
+    written = []
+
+    class _RecordingFrame:
+        def to_csv(self, path, index=False):
+            assert not lock.locked()
+            written.append(path)
+            path.write_text("Date\n")
+
+    stock = FakeStockData("AAPL", 100.0, 10)
+    stock.df = _RecordingFrame()
+    smm.write_data([stock])
+    smm.flush_csv_writes()
+
+    # The frame is written to a temp file that then replaces the cache.
+    assert len(written) == 1 and written[0] != tmp_path / "AAPL.csv"
+    assert (tmp_path / "AAPL.csv").read_text() == "Date\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["AAPL.csv"]
+
+
+def test_queued_csv_save_is_dropped_after_newer_one(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        "shared_memory.shared_memory_manager.CSV_DATA_DIR", tmp_path
+    )
+    smm = SharedMemoryManager({}, Lock(), DummyDataManager(), shm=None)
+
+    class _DeferredPool:
+        def __init__(self):
+            self.jobs = []
+
+        def submit(self, fn, *args):
+            self.jobs.append((fn, args))
+            future = Future()
+            future.set_result(None)
+            return future
+
+    pool = _DeferredPool()
+    smm._io_pool = pool
+
+    class _Frame:
+        def __init__(self, text):
+            self.text = text
+
+        def to_csv(self, path, index=False):
+            path.write_text(self.text)
+
+    old = FakeStockData("AAPL", 100.0, 10)
+    old.df = _Frame("old\n")
+    new = FakeStockData("AAPL", 101.0, 11)
+    new.df = _Frame("new\n")
+    smm.write_data([old])
+    smm.write_data([new])
+
+    # Run the newer save first; the stale one must not overwrite it.
+    for fn, args in reversed(pool.jobs):
+        fn(*args)
+    assert (tmp_path / "AAPL.csv").read_text() == "new\n"
+
+
+def test_write_data_recovers_epoch_parity_after_failure():
+    smm = SharedMemoryManager({}, Lock(), DummyDataManager(), shm=None)
+
+    class _Broken(FakeStockData):
+        def to_serializable_dict(self):
+            raise RuntimeError("boom")
+
+    # A failure while preparing payloads must not leave a write section open.
+    try:
+        smm.write_data([_Broken("AAPL", 1.0, 1)])
+    except RuntimeError:
+        pass
+    assert smm.snapshot_state["epoch"] % 2 == 0
+
+    # Even if an earlier writer left the epoch odd, the next write publishes
+    # an even epoch.
+    smm.snapshot_state["epoch"] = 5
+    smm.write_data([FakeStockData("AAPL", 1.0, 1)])
+    assert smm.snapshot_state["epoch"] == 6
+
+
+def test_write_data_assigns_each_entry_once():
+    class _CountingDict(dict):
+        setitem_calls = 0
+
+        def __setitem__(self, key, value):
+            type(self).setitem_calls += 1
+            super().__setitem__(key, value)
+
+    shared_dict = _CountingDict()
+    smm = SharedMemoryManager(shared_dict, Lock(), DummyDataManager(), shm=None)
+    smm.write_data([FakeStockData("AAPL", 1.0, 1), FakeStockData("MSFT", 2.0, 2)])
+    smm.write_data([FakeStockData("AAPL", 3.0, 3)])
+
+    assert _CountingDict.setitem_calls == 3
+    assert shared_dict["AAPL"]["header"]["epoch"] == 4
+    assert shared_dict["AAPL"]["data"]["df"][0]["Close"] == 3.0
+
+
+def test_debounced_download_notifications_coalesce():
+    smm = SharedMemoryManager(
+        {}, Lock(), DummyDataManager(), shm=None, publish_debounce_s=0.05
+    )
+    published = threading.Event()
+    calls = []
+
+    def _record(stock_data_list):
+        calls.append(stock_data_list)
+        published.set()
+
+    smm.write_data = _record
+    smm.stock_data_manager.get_all_stock_data = lambda: ["AAPL"]
+
+    for _ in range(5):
+        smm.on_download_finished()
+    assert published.wait(1)
+    time.sleep(0.1)
+    smm.close()
+
+    assert calls == [["AAPL"]]
+
+
+def test_save_csv_fast_path_matches_to_csv(monkeypatch, tmp_path):
+    pd = pytest.importorskip("pandas")
+    monkeypatch.setattr(
+        "shared_memory.shared_memory_manager.CSV_DATA_DIR", tmp_path
+    )
+    smm = SharedMemoryManager({}, Lock(), DummyDataManager(), shm=None)
+
+    stock = FakeStockData("AAPL", 100.0, 10)
+    stock.df = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "Open": [1.1, 1234.5678],
+            "High": [2.0, 1300.25],
+            "Low": [1.0, 1200.0],
+            "Close": [1.5, 0.1 + 0.2],
+            "Volume": [10, 20],
+        }
+    )
+    smm.write_data([stock])
+    smm.flush_csv_writes()
+
+    assert (tmp_path / "AAPL.csv").read_text() == stock.df.to_csv(index=False)
+
+    # Intraday timestamps keep their time of day, as with ``to_csv``.
+    stock.df["Date"] = pd.to_datetime(["2024-01-01 15:30", "2024-01-02 00:00"])
+    smm.write_data([stock])
+    smm.flush_csv_writes()
+
+    text = (tmp_path / "AAPL.csv").read_text()
+    assert text == stock.df.to_csv(index=False)
+    assert "2024-01-01 15:30:00" in text
+
+
+def test_save_csv_with_missing_value_round_trips_like_to_csv(monkeypatch, tmp_path):
+    pd = pytest.importorskip("pandas")
+    from stock.stock_data_manager import _parse_csv_rows
+
+    monkeypatch.setattr(
+        "shared_memory.shared_memory_manager.CSV_DATA_DIR", tmp_path
+    )
+    smm = SharedMemoryManager({}, Lock(), DummyDataManager(), shm=None)
+
+    stock = FakeStockData("AAPL", 100.0, 10)
+    stock.df = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "Open": [1.1, 1.2],
+            "High": [2.0, 2.1],
+            "Low": [1.0, 1.1],
+            "Close": [1.5, 1.6],
+            "Volume": [10.0, float("nan")],
+        }
+    )
+    smm.write_data([stock])
+    smm.flush_csv_writes()
+
+    csv_path = tmp_path / "AAPL.csv"
+    assert csv_path.read_text() == stock.df.to_csv(index=False)
+    assert csv_path.read_text().splitlines()[-1].endswith(",1.6,")
+    rows = _parse_csv_rows(str(csv_path))
+    assert [row["Volume"] for row in rows] == [10, 0]
+
+
+def test_persisted_segment_reuses_pre_encoded_entries():
+    shm = shared_memory.SharedMemory(create=True, size=10_000, name="test_shm_pre")
+    smm = SharedMemoryManager({}, Lock(), DummyDataManager(), shm)
+
+    class _Encoded(FakeStockData):
+        encodes = 0
+
+        def to_json_bytes(self):
+            type(self).encodes += 1
+            return json.dumps(self._data).encode()
+
+    smm.write_data([_Encoded("AAPL", 100.0, 10), FakeDateTimeStockData("MSFT")])
+    stored = _read_segment(shm)
+
+    assert _Encoded.encodes == 1
+    assert stored["AAPL"]["data"]["df"][0]["Close"] == 100.0
+    assert stored["AAPL"]["header"]["epoch"] == 2
+    assert stored["MSFT"]["data"]["start_date"] == "2024-01-01T00:00:00"
+
+    shm.close()
+    shm.unlink()
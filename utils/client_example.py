@@ -64,6 +64,7 @@ from __future__ import annotations
 import json
 import logging
 import socket
+import struct
 import uuid
 from typing import Any, Dict, List
 from multiprocessing import shared_memory
@@ -145,6 +146,13 @@ def get_history(reader: StockDataReader, ticker: str) -> List[Any]:
         return []
 
 
+def _read_segment(shm: shared_memory.SharedMemory) -> bytes:
+    """Return the JSON payload stored after the segment's u32 length prefix."""
+
+    (length,) = struct.unpack_from("<I", shm.buf, 0)
+    return bytes(shm.buf[4 : 4 + length])
+
+
 def read_history_with_epoch(shm_name: str, ticker: str, max_retries: int = 6) -> List[Any]:
     """Manually read ``ticker`` using the seqlock protocol.
 
@@ -158,7 +166,7 @@ def read_history_with_epoch(shm_name: str, ticker: str, max_retries: int = 6) ->
     shm = shared_memory.SharedMemory(name=shm_name)
     try:
         for attempt in range(max_retries):
-            raw = bytes(shm.buf).rstrip(b"\x00")
+            raw = _read_segment(shm)
             if not raw:
                 return []
             data = json.loads(raw.decode("utf-8"))
@@ -174,7 +182,7 @@ def read_history_with_epoch(shm_name: str, ticker: str, max_retries: int = 6) ->
             payload = entry.get("data")
             points = payload.get("df", []) if isinstance(payload, dict) else []
 
-            raw2 = bytes(shm.buf).rstrip(b"\x00")
+            raw2 = _read_segment(shm)
             data2 = json.loads(raw2.decode("utf-8"))
             e2 = data2.get(ticker, {}).get("header", {}).get("epoch")
 
@@ -0,0 +1,64 @@
+"""Compact JSON encoding shared by the writer, the reader and the server.
+
+``orjson`` is used when installed; otherwise the stdlib ``json`` module is
+configured to produce the same output: compact separators, datetimes as ISO
+strings, NumPy values as plain numbers and non-finite floats as ``null``.
+"""
+
+import json
+import math
+from datetime import datetime
+from typing import Any, Union
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - fall back to the stdlib codec
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    # NumPy scalars and arrays.
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def _finite(obj):
+    """Return ``obj`` with NaN/Infinity floats replaced by ``None``."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    try:
+        text = json.dumps(
+            obj, separators=(",", ":"), default=_default, allow_nan=False
+        )
+    except ValueError:
+        # Only payloads that contain NaN/Infinity pay for the extra walk;
+        # ``orjson`` writes those values as ``null`` too.
+        text = json.dumps(_finite(obj), separators=(",", ":"), default=_default)
+    return text.encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode a JSON document.
+
+    Raises ``json.JSONDecodeError`` on malformed input
+    (``orjson.JSONDecodeError`` subclasses it).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
@@ -1,6 +1,9 @@
 """Common filesystem locations used across the data manager."""
 
+import os
+import tempfile
 from pathlib import Path
+from typing import Callable
 
 
 # Directory used to persist historical market data in CSV form.  Both the
@@ -10,3 +13,26 @@ from pathlib import Path
 CSV_DATA_DIR = Path(__file__).resolve().parent.parent / "shared_data_csv"
 CSV_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+
+def replace_atomically(path: Path, write: Callable[[Path], None]) -> None:
+    """Create ``path`` by calling ``write`` on a sibling temp file.
+
+    The temp file is swapped in with ``os.replace`` so readers (and a crash
+    mid-write) only ever see the old or the new complete file.  Its name does
+    not end in ``.csv``, so cache discovery never picks it up.
+    """
+    # ``mkstemp`` gives every call its own file, so concurrent writers of the
+    # same path never share a temp file; the last ``os.replace`` wins.
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        # ``mkstemp`` creates the file as 0600; keep the cache world-readable.
+        os.chmod(tmp_path, 0o644)
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise